@@ -0,0 +1,227 @@
+""" End-to-end benchmark for the AIServer query pipeline
+
+Runs AIServer against a local fake Groq endpoint, a fake TTS sink and a simulated MiniArm serial port, drives a scripted
+query workload and reports throughput, per-stage latency percentiles and memory use. No network, microphone or robot
+is needed.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_pipeline --num_queries 200 --first_token_latency 0.15
+    python -m benchmarks.bench_pipeline --duration 3600 --rate 2 --output long_run.json
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+import itertools
+import tracemalloc
+
+from neurobridge_utilities.sim_backends import FakeGroqServer, FakeAudioClient, FakeSerial, load_replies
+
+
+def load_workload(workload_file):
+    """ Reads one query per line, skipping blank lines and '#' comments """
+    with open(workload_file, "r", encoding="utf-8") as file:
+        queries = [line.strip() for line in file]
+    return [q for q in queries if q and not q.startswith("#")]
+
+
+class WorkloadDriver:
+    """ Feeds queries into the server from a background thread, like the terminal/microphone interfaces do
+
+    Parameters:
+    -----------
+        server        (AIServer) : The server under test
+        queries           (list) : Queries to submit, cycled as needed
+        num_queries        (int) : Number of queries to submit when `duration` is 0
+        duration         (float) : Submit queries for this many seconds instead of a fixed count
+        rate             (float) : Queries per second, 0 submits as fast as the server drains the queue
+        memory_interval  (float) : Seconds between memory samples, 0 disables memory tracking
+        stop_every         (int) : Inject an emergency stop after every N queries, 0 disables
+    """
+
+    def __init__(self, server, queries, num_queries=100, duration=0.0, rate=0.0, memory_interval=10.0, stop_every=0):
+        self.server = server
+        self.queries = queries
+        self.num_queries = num_queries
+        self.duration = duration
+        self.rate = rate
+        self.memory_interval = memory_interval
+        self.stop_every = stop_every
+        self.submitted = 0
+        self.memory_samples = []
+        self.start_time = None
+        self.end_time = None
+
+    def _processed(self):
+        return self.server.stats.count('queries_processed')
+
+    def _finished(self):
+        # Queries dropped by an emergency stop never reach the processing loop
+        return (self._processed() + self.server.stats.count('queries_dropped')
+                + self.server.stats.count('queries_failed'))
+
+    def _sample_memory(self):
+        current, peak = tracemalloc.get_traced_memory()
+        self.memory_samples.append({
+            'elapsed_s': time.monotonic() - self.start_time,
+            'processed': self._processed(),
+            'current_mb': current / 2 ** 20,
+            'peak_mb': peak / 2 ** 20,
+        })
+
+    def run(self):
+        """ Submits the workload, waits for the server to drain it, then stops the server """
+        workload = itertools.cycle(self.queries)
+        self.start_time = time.monotonic()
+        next_memory_sample = self.start_time
+        while True:
+            now = time.monotonic()
+            if self.memory_interval and now >= next_memory_sample:
+                self._sample_memory()
+                next_memory_sample = now + self.memory_interval
+
+            if self.duration:
+                if now - self.start_time >= self.duration:
+                    break
+            elif self.submitted >= self.num_queries:
+                break
+
+            if self.rate:
+                # Open loop: submit on a fixed schedule regardless of how far behind the server is
+                due = self.start_time + self.submitted / self.rate
+                if now < due:
+                    time.sleep(min(due - now, 0.05))
+                    continue
+            elif self.submitted > self._finished():
+                # Closed loop: keep exactly one query in flight
+                time.sleep(0.001)
+                continue
+
+            query = next(workload)
+            self.server.submit_query(query)
+            if self.server.intent_matcher.is_stop(query):
+                continue  # Handled on the priority lane, never queued
+            self.submitted += 1
+            if self.stop_every and self.submitted % self.stop_every == 0:
+                self.server.submit_query("stop")
+
+        while self._finished() < self.submitted:
+            time.sleep(0.01)
+        self.end_time = time.monotonic()
+        if self.memory_interval:
+            self._sample_memory()
+        self.server.parameters['all_stop'] = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="NeuroBridge end-to-end pipeline benchmark")
+    parser.add_argument("--workload", type=str, default=os.path.join(os.path.dirname(__file__), "workloads", "basic.txt"),
+                        help="File with one query per line")
+    parser.add_argument("--replies", type=str, default=None, help="JSON/JSONL file with canned LLM replies")
+    parser.add_argument("--num_queries", type=int, default=100, help="Number of queries to run")
+    parser.add_argument("--duration", type=float, default=0.0, help="Run for this many seconds instead of --num_queries")
+    parser.add_argument("--rate", type=float, default=0.0, help="Queries per second, 0 for closed loop")
+    parser.add_argument("--first_token_latency", type=float, default=0.2, help="Fake LLM first-token latency (s)")
+    parser.add_argument("--tokens_per_second", type=float, default=500.0, help="Fake LLM token rate")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Relative jitter on fake LLM latencies")
+    parser.add_argument("--error_rate", type=float, default=0.0, help="Fraction of fake LLM requests that fail")
+    parser.add_argument("--error_status", type=int, default=429, help="HTTP status for injected LLM errors")
+    parser.add_argument("--slow_rate", type=float, default=0.0, help="Fraction of fake LLM requests that are slow")
+    parser.add_argument("--slow_factor", type=float, default=10.0, help="Latency multiplier for slow requests")
+    parser.add_argument("--fallback_model", type=str, default=None, help="Fallback model name")
+    parser.add_argument("--request_timeout", type=float, default=20.0, help="LLM request deadline in seconds")
+    parser.add_argument("--max_retries", type=int, default=2, help="LLM retries on transient errors")
+    parser.add_argument("--hedge", action="store_true", help="Hedge LLM requests slower than the observed p95")
+    parser.add_argument("--tts_chars_per_second", type=float, default=0.0, help="Fake TTS speaking rate, 0 is instant")
+    parser.add_argument("--no_robot", action="store_true", help="Skip the MiniArmClient on a simulated serial port")
+    parser.add_argument("--stop_every", type=int, default=0, help="Inject an emergency stop after every N queries")
+    parser.add_argument("--no_fast_path", action="store_true", help="Send every query to the (fake) LLM")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Simulated serial line rate")
+    parser.add_argument("--model", type=str, default="llama-3.1-8b-instant", help="Model name sent to the fake LLM")
+    parser.add_argument("--personality", type=str, default="prompts/personality_robot_friendly.txt",
+                        help="Path to prompt file")
+    parser.add_argument("--memory_file", type=str, default=None,
+                        help="SQLite file for conversation memory, default keeps it in RAM")
+    parser.add_argument("--memory_interval", type=float, default=10.0,
+                        help="Seconds between memory samples, 0 disables tracemalloc (which adds overhead)")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    replies = load_replies(args.replies) if args.replies else None
+    fake_llm = FakeGroqServer(replies=replies,
+                              first_token_latency=args.first_token_latency,
+                              tokens_per_second=args.tokens_per_second,
+                              jitter=args.jitter,
+                              error_rate=args.error_rate,
+                              error_status=args.error_status,
+                              slow_rate=args.slow_rate,
+                              slow_factor=args.slow_factor).start()
+
+    # ChatGroq picks these up when the message handler is created
+    os.environ["GROQ_API_BASE"] = fake_llm.base_url
+    os.environ["GROQ_API_KEY"] = "fake-benchmark-key"
+
+    from mini_arm import MiniArmClient
+    from neurobridge_utilities.ai_server import AIServer
+
+    robot = MiniArmClient('SimArm', serial_device=FakeSerial(args.baudrate)) if not args.no_robot else None
+    server = AIServer(llm_model_id=args.model,
+                      enable_tts=True,
+                      personality_prompt=args.personality,
+                      audio_client=FakeAudioClient(chars_per_second=args.tts_chars_per_second),
+                      robot_client=robot,
+                      enable_fast_path=not args.no_fast_path,
+                      memory_file=args.memory_file,
+                      fallback_model_id=args.fallback_model,
+                      request_timeout=args.request_timeout,
+                      max_retries=args.max_retries,
+                      hedge_requests=args.hedge)
+
+    driver = WorkloadDriver(server, load_workload(args.workload),
+                            num_queries=args.num_queries,
+                            duration=args.duration,
+                            rate=args.rate,
+                            memory_interval=args.memory_interval,
+                            stop_every=args.stop_every)
+    if args.memory_interval:
+        tracemalloc.start()
+    print(f"🚀 Benchmark starting, fake LLM at {fake_llm.base_url}")
+    threading.Thread(target=driver.run, daemon=True).start()
+    asyncio.run(server.process_user_queries())
+    server.message_handler.close()
+    fake_llm.stop()
+
+    wall_time = driver.end_time - driver.start_time
+    processed = server.stats.count('queries_processed')
+    results = {
+        'queries': processed,
+        'wall_time_s': wall_time,
+        'throughput_qps': processed / wall_time if wall_time > 0 else 0.0,
+        'llm_requests': fake_llm.request_count,
+        'llm_injected_errors': fake_llm.error_count,
+        'llm_client': server.message_handler.llm.stats.summary(),
+        'llm_client_counters': dict(server.message_handler.llm.stats.counters),
+        'stages': server.stats.summary(),
+        'parse_outcomes': dict(server.message_handler.parse_counts),
+        'memory': driver.memory_samples,
+    }
+
+    print("\n" + server.stats.report())
+    print(f"\nLLM client: {dict(server.message_handler.llm.stats.counters)}, "
+          f"{fake_llm.request_count} requests ({fake_llm.error_count} injected errors)")
+    print(f"Response parsing: {dict(server.message_handler.parse_counts)}")
+    print(f"\nProcessed {processed} queries in {wall_time:.2f}s ({results['throughput_qps']:.2f} queries/s)")
+    if driver.memory_samples:
+        first, last = driver.memory_samples[0], driver.memory_samples[-1]
+        print(f"Traced memory: {first['current_mb']:.2f} MB -> {last['current_mb']:.2f} MB "
+              f"(peak {last['peak_mb']:.2f} MB)")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
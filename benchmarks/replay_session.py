@@ -0,0 +1,236 @@
+""" Offline replay of a recorded NeuroBridge session
+
+Replays the inputs of a session log (recorded with `python main.py --record_session session.nbrec`) through the same
+AIServer code, with the recorded LLM replies served by a local fake Groq endpoint, TTS stubbed out and the robot on a
+simulated serial port that answers with the recorded serial reads. Inputs the server rejected while recording (rate
+limits, full queues) are skipped, and LLM calls that failed while recording fail again. Reports the per-stage latencies next to the ones measured while recording (or a previous
+replay), and checks that the robot received the same serial commands.
+
+Usage (from the repository root):
+    python -m benchmarks.replay_session session.nbrec                      # real time, recorded LLM latencies
+    python -m benchmarks.replay_session session.nbrec --max_speed --output new.json --compare old.json
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+from neurobridge_utilities.perf_stats import compare_summaries
+from neurobridge_utilities.ai_sessions import Session, QueryRejected
+from neurobridge_utilities.session_recorder import (read_session_log, EVENT_META, EVENT_INPUT, EVENT_LLM_REPLY,
+                                                    EVENT_SERIAL_TX, EVENT_SERIAL_RX, EVENT_STATS)
+from neurobridge_utilities.sim_backends import FakeGroqServer, FakeAudioClient, FakeSerial
+
+
+def load_session(log_file):
+    """ Splits a session log into metadata, inputs, LLM replies, serial writes and reads and the recorded stage
+    timings. Serial reads are grouped by the number of writes that preceded them. """
+    session = {'meta': {}, 'inputs': [], 'replies': [], 'serial_tx': [], 'serial_rx': {}, 'stats': None}
+    for timestamp, kind, payload in read_session_log(log_file):
+        if kind == EVENT_META:
+            session['meta'] = payload
+        elif kind == EVENT_INPUT:
+            session['inputs'].append((timestamp, payload))
+        elif kind == EVENT_LLM_REPLY:
+            session['replies'].append(payload)
+        elif kind == EVENT_SERIAL_TX:
+            session['serial_tx'].append(payload)
+        elif kind == EVENT_SERIAL_RX:
+            session['serial_rx'].setdefault(len(session['serial_tx']), []).append(payload)
+        elif kind == EVENT_STATS:
+            session['stats'] = payload
+    return session
+
+
+class CapturingSerial(FakeSerial):
+    """ Simulated serial port that keeps every write, to compare with the recorded traffic
+
+    Once `rx_script` (write count -> recorded lines) is set, the robot answers the n-th write with the lines that were
+    read after the n-th recorded write instead of the simulated replies.
+    """
+
+    def __init__(self, baudrate=9600):
+        super().__init__(baudrate)
+        self.transmitted = []
+        self.rx_script = None
+
+    def write(self, data):
+        self.transmitted.append(bytes(data))
+        return super().write(data)
+
+    def replies_to(self, data):
+        if self.rx_script is None:
+            return super().replies_to(data)
+        return self.rx_script.get(len(self.transmitted), [])
+
+
+class ReplayDriver:
+    """ Submits the recorded inputs to the server, either at their recorded times or back to back
+
+    Network sessions are recreated without a rate limit or queue bound, so the replay at maximum speed isn't throttled
+    by limits meant for real clients.
+
+    Parameters:
+    -----------
+        server     (AIServer) : The server under test
+        inputs         (list) : (seconds since start, input record) tuples from the session log
+        max_speed      (bool) : Submit each query as soon as the previous one finished instead of at its recorded time
+    """
+
+    def __init__(self, server, inputs, max_speed=False):
+        self.server = server
+        self.inputs = inputs
+        self.max_speed = max_speed
+        self.submitted = 0
+        self.rejected = 0
+        self.start_time = None
+        self.end_time = None
+
+    def _finished(self):
+        stats = self.server.stats
+        return stats.count('queries_processed') + stats.count('queries_dropped') + stats.count('queries_failed')
+
+    def _wait_until_drained(self):
+        while self._finished() < self.submitted:
+            time.sleep(0.001)
+
+    def _get_session(self, session_id):
+        """ Returns the replayed network session, or None for the local one """
+        if session_id == self.server.local_session.session_id:
+            return None
+        session = self.server.scheduler.get_session(session_id)
+        if session is None:
+            session = self.server.scheduler.add_session(Session(session_id, rate_limit=0, max_pending=None))
+        return session
+
+    def run(self):
+        """ Replays the inputs, waits for the server to drain them, then stops the server """
+        self.start_time = time.monotonic()
+        for timestamp, record in self.inputs:
+            if record.get('rejected'):
+                self.rejected += 1  # Refused by the server while recording, it never ran
+                continue
+            if self.max_speed:
+                self._wait_until_drained()
+            else:
+                delay = self.start_time + timestamp - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+            session = self._get_session(record['session'])
+            query = record['query']
+            try:
+                self.server.submit_query(query, session=session, source=record['source'])
+            except QueryRejected as e:
+                print(f"⚠️ Replayed query rejected ({e.reason}): {query}")
+                self.rejected += 1
+                continue
+            if not self.server.intent_matcher.is_stop(query):  # Stops never reach the queue
+                self.submitted += 1
+
+        self._wait_until_drained()
+        self.end_time = time.monotonic()
+        self.server.parameters['all_stop'] = True
+
+
+def compare_serial(recorded, replayed):
+    """ Returns (number of differing writes, index of the first difference or None) """
+    mismatches = sum(a != b for a, b in zip(recorded, replayed)) + abs(len(recorded) - len(replayed))
+    first = next((i for i, (a, b) in enumerate(zip(recorded, replayed)) if a != b), None)
+    if first is None and len(recorded) != len(replayed):
+        first = min(len(recorded), len(replayed))
+    return mismatches, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded NeuroBridge session offline")
+    parser.add_argument("log_file", type=str, help="Session log recorded with --record_session")
+    parser.add_argument("--max_speed", action="store_true",
+                        help="Submit queries back to back with instant LLM replies instead of in real time")
+    parser.add_argument("--baudrate", type=int, default=9600, help="Simulated serial line rate, 0 for instant writes")
+    parser.add_argument("--personality", type=str, default=None, help="Override the recorded personality prompt")
+    parser.add_argument("--compare", type=str, default=None,
+                        help="Results JSON of a previous replay to compare with, default is the recorded session")
+    parser.add_argument("--output", type=str, default=None, help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    session = load_session(args.log_file)
+    parameters = session['meta'].get('parameters', {})
+    replies = session['replies']
+    print(f"📼 {args.log_file}: {len(session['inputs'])} inputs, {len(replies)} LLM replies, "
+          f"{len(session['serial_tx'])} serial writes")
+
+    # Replies are served in recorded order, which matches as long as the fast-path setting is the same. Cancelled
+    # calls get an empty reply after their recorded latency (so a replayed stop lands mid-call again), failed ones an
+    # error
+    fake_llm = FakeGroqServer(replies=[r['reply'] or "" for r in replies] or None,
+                              latencies=None if args.max_speed else [r['latency'] for r in replies] or None,
+                              statuses=[500 if r.get('status') == 'error' else None for r in replies] or None,
+                              first_token_latency=0.0,
+                              tokens_per_second=0.0).start()
+    os.environ["GROQ_API_BASE"] = fake_llm.base_url
+    os.environ["GROQ_API_KEY"] = "fake-replay-key"
+
+    from mini_arm import MiniArmClient
+    from neurobridge_utilities.ai_server import AIServer
+
+    serial_device = CapturingSerial(args.baudrate)
+    robot = MiniArmClient('SimArm', serial_device=serial_device) if parameters.get('use_robot') else None
+    server = AIServer(llm_model_id=parameters.get('llm_model_id', "llama-3.1-8b-instant"),
+                      enable_tts=True,
+                      personality_prompt=args.personality or parameters.get('personality_prompt'),
+                      audio_client=FakeAudioClient(),
+                      robot_client=robot,
+                      enable_fast_path=parameters.get('enable_fast_path', True),
+                      max_retries=0)
+    serial_device.transmitted.clear()  # The recording starts after the robot's connection handshake
+    serial_device.reset_input_buffer()
+    serial_device.rx_script = session['serial_rx']
+
+    driver = ReplayDriver(server, session['inputs'], max_speed=args.max_speed)
+    print(f"▶️ Replaying {'at maximum speed' if args.max_speed else 'in real time'}")
+    threading.Thread(target=driver.run, daemon=True).start()
+    asyncio.run(server.process_user_queries())
+    server.message_handler.close()
+    fake_llm.stop()
+
+    mismatches, first = compare_serial(session['serial_tx'], serial_device.transmitted) if robot else (0, None)
+    results = {
+        'log_file': args.log_file,
+        'max_speed': args.max_speed,
+        'wall_time_s': driver.end_time - driver.start_time,
+        'stages': server.stats.summary(),
+        'counters': dict(server.stats.counters),
+        'rejected_queries': driver.rejected,
+        'llm_requests': fake_llm.request_count,
+        'serial_mismatches': mismatches,
+    }
+
+    print("\n" + server.stats.report())
+    if len(replies) != fake_llm.request_count:
+        print(f"⚠️ The replay made {fake_llm.request_count} LLM requests, the recording has {len(replies)} replies")
+    if mismatches:
+        print(f"⚠️ {mismatches} serial writes differ from the recording, first at write #{first}")
+    elif robot:
+        print(f"✅ Serial traffic matches the recording ({len(serial_device.transmitted)} writes)")
+
+    baseline, label = None, None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            baseline, label = json.load(file)['stages'], args.compare
+    elif session['stats']:
+        baseline, label = session['stats']['stages'], "the recorded session"
+    if baseline:
+        print(f"\nStage latencies (ms) compared with {label}:")
+        print(compare_summaries(baseline, results['stages']))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
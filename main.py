@@ -1,7 +1,10 @@
+import os
 import asyncio
 import argparse
 
 from neurobridge_utilities.ai_server import AIServer
+from neurobridge_utilities.config_store import ConfigStore
+from neurobridge_utilities.config_reader import parse_value
 
 
 if __name__ == "__main__":
@@ -10,17 +13,60 @@ if __name__ == "__main__":
     parser.add_argument("--enable_tts", type=bool, default=False, help="Enable Text-To-Speech")
     parser.add_argument("--enable_stt", type=bool, default=False, help="Enable Speech-To-Text")
     parser.add_argument("--enable_camera", type=bool, default=False, help="Enable camera")
-    parser.add_argument("--camera_id", type=int, default=0, help="Camera ID")
+    parser.add_argument("--camera_id", type=str, default="0", help="Camera ID or device, or a video file / image directory")
+    parser.add_argument("--camera_width", type=int, default=640, help="Requested camera capture width")
+    parser.add_argument("--camera_height", type=int, default=480, help="Requested camera capture height")
+    parser.add_argument("--camera_fps", type=int, default=30, help="Requested camera frame rate")
+    parser.add_argument("--camera_fourcc", type=str, default="MJPG", help="Requested camera pixel format (MJPG, YUYV)")
     parser.add_argument("--use_robot", type=bool, default=False, help="Use robot")
     parser.add_argument("--robot_port", type=str, default="COM7", help="Robot port")
     parser.add_argument("--personality", type=str, default="prompts/personality_robot_friendly.txt", help="Path to prompt file")
+    parser.add_argument("--enable_fast_path", type=parse_value, default=True,
+                        help="Run simple commands locally, false sends every query to the LLM")
+    parser.add_argument("--enable_network", type=bool, default=False, help="Serve the local WebSocket/HTTP API")
+    parser.add_argument("--network_port", type=int, default=8765, help="Port for the WebSocket/HTTP API")
+    parser.add_argument("--session_rate_limit", type=float, default=1.0, help="Queries per second per network session")
+    parser.add_argument("--session_burst", type=int, default=5, help="Back-to-back queries allowed per network session")
+    parser.add_argument("--memory_file", type=str, default="memory/conversations.db",
+                        help="SQLite file for persistent conversation memory, empty string keeps memory in RAM only")
+    parser.add_argument("--fallback_model", type=str, default=None, help="Smaller LLM used when the primary is slow or failing")
+    parser.add_argument("--request_timeout", type=float, default=20.0, help="LLM request deadline in seconds")
+    parser.add_argument("--max_retries", type=int, default=2, help="LLM retries on rate limits and server errors")
+    parser.add_argument("--hedge_requests", type=bool, default=False, help="Hedge slow LLM requests with a second one")
+    parser.add_argument("--record_session", type=str, default=None, help="Record the session to this log file for replay")
+    parser.add_argument("--record_frames", type=bool, default=False, help="Also record camera frames in the session log")
     parser.add_argument("--verbose", type=bool, default=False, help="Enable verbose mode")
+
+    # Values from the config file replace the defaults, arguments given on the command line still take precedence
+    config_args, _ = parser.parse_known_args()
+    config_store = None
+    if os.path.exists(config_args.config_file):
+        config_store = ConfigStore(config_args.config_file)
+        parser.set_defaults(**{key: value for key, value in config_store.values.items() if key in vars(config_args)})
     args = parser.parse_args()
 
     server = AIServer(enable_stt=args.enable_stt,
                       enable_tts=args.enable_tts,
+                      enable_camera=args.enable_camera,
+                      camera_id=args.camera_id,
+                      camera_resolution=(args.camera_width, args.camera_height),
+                      camera_fps=args.camera_fps,
+                      camera_fourcc=args.camera_fourcc,
                       use_robot=args.use_robot,
                       robot_port=args.robot_port,
                       personality_prompt=args.personality,
+                      enable_fast_path=args.enable_fast_path,
+                      enable_network=args.enable_network,
+                      network_port=args.network_port,
+                      session_rate_limit=args.session_rate_limit,
+                      session_burst=args.session_burst,
+                      memory_file=args.memory_file or None,
+                      fallback_model_id=args.fallback_model,
+                      request_timeout=args.request_timeout,
+                      max_retries=args.max_retries,
+                      hedge_requests=args.hedge_requests,
+                      config_store=config_store,
+                      record_file=args.record_session,
+                      record_frames=args.record_frames,
                       verbose=args.verbose)
     asyncio.run(server.run())
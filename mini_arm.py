@@ -15,17 +15,20 @@ class MiniArmClient(object):
     name (str) : Name of the client
     port (str) : Serial port to connect to
     baudrate (int) : Baudrate for the serial connection
+    serial_device (object) : Optional already-open serial-like device to use instead of opening `port`
     visualize (bool) : Enable/disable visualization
     verbose (bool) : Enable/disable verbose output
     """
 
-    def __init__(self, name='MiniArmClient', port='COM3', baudrate=9600, command_delimiter=';', verbose=False):
+    def __init__(self, name='MiniArmClient', port='COM3', baudrate=9600, command_delimiter=';', serial_device=None,
+                 verbose=False):
         self.name = name
         self.command_delimiter = command_delimiter
         self.verbose = verbose
+        self.write_lock = threading.Lock()  # Keeps a halt from interleaving with a message being written
 
         # Setup serial communication
-        self.s = serial.Serial(port, baudrate, timeout=1)
+        self.s = serial_device if serial_device is not None else serial.Serial(port, baudrate, timeout=1)
         self.connected = True if self.s.is_open else False
 
         # Print out any bytes currently in the buffer
@@ -60,7 +63,8 @@ class MiniArmClient(object):
                 message += self.command_delimiter  # Add terminator character to the message
 
             try:
-                self.s.write(message.encode())
+                with self.write_lock:
+                    self.s.write(message.encode())
                 if self.verbose:
                     print(f"Sent message to Pico: {message}")
 
@@ -124,6 +128,22 @@ class MiniArmClient(object):
         """ Sends the robot arm to the home position"""
         self.send_message("home;")
 
+    def stop(self):
+        """ Halts the robot arm immediately. Discards any bytes still waiting to go out and sends the same Ctrl+C
+        interrupt as `send_ctrl_c` (the firmware has no dedicated stop command), without the usual inter-message delay.
+        Safe to call from any thread.
+        """
+        if self.s and self.s.is_open:
+            try:
+                if hasattr(self.s, 'reset_output_buffer'):
+                    self.s.reset_output_buffer()
+                with self.write_lock:
+                    self.s.write(b'\x03')
+            except serial.SerialException as e:
+                print(f"Error sending halt: {e}")
+        else:
+            print("Serial connection not available or not open.")
+
     def send_ctrl_c(self):
         """ Sends the Ctrl+C command to the robot arm"""
         self.s.write(b'\x03')
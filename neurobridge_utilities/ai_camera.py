@@ -1,9 +1,10 @@
 import os
 import cv2
 import torch
-from PIL import Image
 from transformers import AutoProcessor, AutoModelForZeroShotObjectDetection
 
+from neurobridge_utilities.camera_capture import CameraCapture
+
 class DINODetection:
     """ Handles object tracking using Grounding DINO. """
     def __init__(self, dino_model_id="IDEA-Research/grounding-dino-tiny"):
@@ -23,17 +24,26 @@ class DINODetection:
         self.grounding_model = AutoModelForZeroShotObjectDetection.from_pretrained(self.grounding_dino_id,
                                                                                    cache_dir=dino_path).to(self.device)
 
-    def detect_objects(self, frame, prompt="bottle"):
-        """Detects objects in a given frame using Grounding DINO."""
-        image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
-        inputs = self.processor(images=image, text=prompt, return_tensors="pt").to(self.device)
+    def input_size(self, width, height):
+        """ Returns the (width, height) the processor resizes a width x height image to before inference """
+        size = self.processor.image_processor.size
+        scale = min(size["shortest_edge"] / min(width, height), size["longest_edge"] / max(width, height))
+        return round(width * scale), round(height * scale)
+
+    def detect_objects(self, frame, prompt="bottle", rgb=False):
+        """Detects objects in a given BGR (or RGB with `rgb`) frame using Grounding DINO. Frames already at
+        `input_size` are passed to the model without the processor's resize."""
+        image = frame if rgb else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = image.shape[:2]
+        do_resize = (width, height) != self.input_size(width, height)
+        inputs = self.processor(images=image, text=prompt, return_tensors="pt", do_resize=do_resize).to(self.device)
         with torch.no_grad():
             outputs = self.grounding_model(**inputs)
         results = self.processor.post_process_grounded_object_detection(
-            outputs, inputs.input_ids, box_threshold=0.4, text_threshold=0.4, target_sizes=[image.size[::-1]]
+            outputs, inputs.input_ids, box_threshold=0.4, text_threshold=0.4, target_sizes=[(height, width)]
         )
         input_boxes = results[0]["boxes"].cpu().numpy()
-        confidences = results[0]["scores"].cpu().numpy().to_list()
+        confidences = results[0]["scores"].cpu().numpy().tolist()
         class_names = results[0]["labels"]
         return input_boxes, confidences, class_names
 
@@ -46,26 +56,62 @@ class DINODetection:
         return frame
 
 class AICamera:
-    """ Manages camera streaming and object detection """
+    """ Manages camera streaming and object detection
+
+    Parameters:
+    -----------
+        camera_id        (int, str) : Camera index or device path, or a video file / image directory for offline runs
+        detector_id           (str) : The object detection model
+        scene_state    (SceneState) : Optional store collecting the detections for the LLM
+        recorder  (SessionRecorder) : Optional session recorder that logs frames
+        resolution          (tuple) : Requested capture (width, height)
+        fps                 (float) : Requested capture frame rate
+        fourcc                (str) : Requested capture pixel format, MJPEG by default
+        frame_size          (tuple) : (width, height) frames are decoded to for display and detection, None uses
+                                      the detector's input size. Frames are never scaled above the capture size
+    """
 
-    def __init__(self, camera_id=0, detector_id="IDEA-Research/grounding-dino-tiny"):
+    def __init__(self, camera_id=0, detector_id="IDEA-Research/grounding-dino-tiny", scene_state=None,
+                 recorder=None, resolution=(640, 480), fps=30, fourcc="MJPG", frame_size=None):
         self.camera_id = camera_id
-        self.cap = None
+        self.capture = None
         self.running = False
+        self.scene_state = scene_state  # Optional SceneState that collects detections for the LLM
+        self.recorder = recorder  # Optional SessionRecorder that logs frames
+        self.resolution = resolution
+        self.fps = fps
+        self.fourcc = fourcc
+        self.frame_size = frame_size
 
         if detector_id == "IDEA-Research/grounding-dino-tiny":
             self.detector = DINODetection()
         else:
             raise ValueError("Invalid detector ID")
 
+    def frames(self):
+        """ Yields the latest frame each time a new one arrives, until the camera is stopped """
+        frame_id = 0
+        while self.running and self.capture is not None:
+            latest = self.capture.get_frame(frame_id, timeout=0.5)
+            if latest is None:
+                if not self.capture.running:
+                    break  # The source ended (non-looping file)
+                continue
+            frame_id, frame = latest
+            yield frame
+
     def start(self):
         """ Starts the camera stream """
-        self.cap = cv2.VideoCapture(self.camera_id)
+        # Frames larger than the detector's input are decoded straight to it (BGR, for display), smaller ones are
+        # left at the capture size and only scaled up by the detector's processor when a detection runs
+        self.capture = CameraCapture(self.camera_id, width=self.resolution[0], height=self.resolution[1],
+                                     fps=self.fps, fourcc=self.fourcc,
+                                     output_size=self.frame_size or self.detector.input_size).start()
+        if self.capture is None:
+            return
         self.running = True
-        while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                cv2.imshow("Camera Feed", frame)
+        for frame in self.frames():
+            cv2.imshow("Camera Feed", frame)
             if cv2.waitKey(1) & 0xFF == ord('q'):
                 break
         self.stop()
@@ -73,16 +119,17 @@ class AICamera:
     def stop(self):
         """ Stops the camera stream """
         self.running = False
-        if self.cap:
-            self.cap.release()
+        if self.capture:
+            self.capture.stop()
         cv2.destroyAllWindows()
 
     def detect_objects(self, prompt="bottle"):
         """ Runs object detection """
         print(f"Detecting objects: {prompt}")
-        while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                boxes, confidences, class_names = self.detector.detect_objects(frame, prompt)
-                print(f"Detected: {class_names}")
-
+        for frame in self.frames():
+            if self.recorder is not None:
+                self.recorder.record_frame(frame)
+            boxes, confidences, class_names = self.detector.detect_objects(frame, prompt)
+            if self.scene_state is not None:
+                self.scene_state.update(boxes, confidences, class_names, frame.shape)
+            print(f"Detected: {class_names}")
@@ -0,0 +1,333 @@
+import os
+import queue
+import sqlite3
+import threading
+import collections
+
+from langgraph.checkpoint.base import BaseCheckpointSaver, CheckpointTuple, WRITES_IDX_MAP, get_checkpoint_id
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT,
+    checkpoint BLOB,
+    metadata_type TEXT,
+    metadata BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+class _ThreadState:
+    """ In-memory copy of one conversation thread's retained checkpoints and pending writes """
+
+    def __init__(self):
+        # checkpoint_ns -> {checkpoint_id: (checkpoint_typed, metadata_typed, parent_checkpoint_id)}
+        self.checkpoints = collections.defaultdict(dict)
+        # (checkpoint_ns, checkpoint_id) -> {(task_id, idx): (task_id, channel, value_typed, task_path)}
+        self.writes = collections.defaultdict(dict)
+
+
+class DiskCheckpointSaver(BaseCheckpointSaver):
+    """ Disk-backed LangGraph checkpointer for conversation memory
+
+    Checkpoints are kept in a SQLite database in WAL mode. The agent only ever talks to an in-memory cache of recently
+    used threads; new checkpoints are handed to a background writer that commits them in batches, so the LLM loop never
+    waits on the disk. Threads are loaded lazily the first time they are touched, least recently used threads are
+    evicted from memory, and each thread only keeps its last `keep_last` checkpoints (older ones are compacted away in
+    memory and on disk). Memory use therefore stays flat no matter how long the server runs or how many threads exist.
+
+    A batch that fails to commit (disk full, database locked) is logged and counted in `write_errors`; its changes stay
+    in memory for the running process. Waiting for the writer is bounded by `flush_timeout`, so a dead writer makes
+    memory access raise instead of hanging the LLM loop.
+
+    Parameters:
+    -----------
+        db_path               (str) : Path to the SQLite database file, created if missing
+        keep_last             (int) : Checkpoints retained per thread and namespace
+        max_cached_threads    (int) : Threads kept in memory before the least recently used is evicted
+        flush_interval      (float) : Maximum seconds a checkpoint waits before being written to disk
+        batch_size            (int) : Maximum rows committed in a single transaction
+        flush_timeout       (float) : Maximum seconds to wait for queued writes to reach the disk
+    """
+
+    def __init__(self, db_path, keep_last=5, max_cached_threads=32, flush_interval=0.5, batch_size=256,
+                 flush_timeout=10.0):
+        super().__init__()
+        self.db_path = db_path
+        self.keep_last = keep_last
+        self.max_cached_threads = max_cached_threads
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.flush_timeout = flush_timeout
+        self.write_errors = 0
+
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.threads = collections.OrderedDict()  # LRU cache of thread_id -> _ThreadState
+
+        # Reader connection for lazy loads, the writer thread owns its own connection
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(_SCHEMA)
+        self.conn.commit()
+
+        self.write_queue = queue.Queue()
+        self.closed = False
+        self.writer = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer.start()
+
+    # ---- Cache ----
+
+    def _get_thread(self, thread_id):
+        """ Returns the cached thread state, loading it from disk on first use """
+        with self.lock:
+            state = self.threads.get(thread_id)
+            if state is not None:
+                self.threads.move_to_end(thread_id)
+                return state
+
+        # Make sure anything queued for this thread is on disk before reading it back
+        self.flush()
+        state = self._load_thread(thread_id)
+        with self.lock:
+            # Another caller may have loaded it in the meantime
+            state = self.threads.setdefault(thread_id, state)
+            self.threads.move_to_end(thread_id)
+            while len(self.threads) > self.max_cached_threads:
+                self.threads.popitem(last=False)
+        return state
+
+    def _load_thread(self, thread_id):
+        state = _ThreadState()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                "FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchall()
+            write_rows = self.conn.execute(
+                "SELECT checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value, task_path "
+                "FROM writes WHERE thread_id = ?", (thread_id,)).fetchall()
+        for ns, checkpoint_id, parent_id, type_, checkpoint, metadata_type, metadata in rows:
+            state.checkpoints[ns][checkpoint_id] = ((type_, checkpoint), (metadata_type, metadata), parent_id)
+        for ns, checkpoint_id, task_id, idx, channel, type_, value, task_path in write_rows:
+            state.writes[(ns, checkpoint_id)][(task_id, idx)] = (task_id, channel, (type_, value), task_path)
+        return state
+
+    def _compact(self, thread_id, state, ns):
+        """ Drops all but the newest `keep_last` checkpoints of a thread namespace (checkpoint IDs sort by time) """
+        checkpoints = state.checkpoints[ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        retained = sorted(checkpoints)[-self.keep_last:]
+        oldest_kept = retained[0]
+        for checkpoint_id in [c for c in checkpoints if c < oldest_kept]:
+            del checkpoints[checkpoint_id]
+            state.writes.pop((ns, checkpoint_id), None)
+        self.write_queue.put(("compact", (thread_id, ns, oldest_kept)))
+
+    # ---- Background writer ----
+
+    def _writer_loop(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, avoids an fsync per commit
+        while True:
+            try:
+                ops = [self.write_queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(ops) < self.batch_size:
+                try:
+                    ops.append(self.write_queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            waiters = [payload for op, payload in ops if op == "flush"]
+            stop = any(op == "stop" for op, _ in ops)
+            try:
+                self._write_batch(conn, ops)
+            except sqlite3.Error as e:
+                self.write_errors += 1
+                changes = len(ops) - len(waiters) - stop
+                print(f"⚠️ Conversation memory write failed, {changes} queued changes not saved to disk: {e}")
+            finally:
+                # Waiters are released even if the batch failed, nobody should block on a write that won't happen
+                for event in waiters:
+                    event.set()
+            if stop:
+                break
+        conn.close()
+
+    @staticmethod
+    def _write_batch(conn, ops):
+        """ Commits a batch of queued operations in one transaction (rolled back as a whole on error) """
+        with conn:
+            for op, payload in ops:
+                if op == "checkpoint":
+                        conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)", payload)
+                elif op == "write":
+                    conn.execute("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", payload)
+                elif op == "compact":
+                    conn.execute("DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                                 "AND checkpoint_id < ?", payload)
+                    conn.execute("DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+                                 "AND checkpoint_id < ?", payload)
+                elif op == "delete_thread":
+                    conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", payload)
+                    conn.execute("DELETE FROM writes WHERE thread_id = ?", payload)
+
+    def flush(self, timeout=None):
+        """ Blocks until every queued write has been committed to disk (or failed). Raises TimeoutError if the
+        writer doesn't get to them within `timeout` seconds (`flush_timeout` by default). """
+        if self.closed:
+            return
+        timeout = self.flush_timeout if timeout is None else timeout
+        event = threading.Event()
+        self.write_queue.put(("flush", event))
+        if not event.wait(timeout):
+            raise TimeoutError(f"Conversation memory writer didn't flush within {timeout:.1f}s")
+
+    def close(self):
+        """ Flushes pending writes and stops the background writer """
+        if self.closed:
+            return
+        self.write_queue.put(("stop", None))
+        self.writer.join(self.flush_timeout)
+        if self.writer.is_alive():
+            print("⚠️ Conversation memory writer didn't stop, some changes may not be saved")
+        self.closed = True
+        self.conn.close()
+
+    # ---- BaseCheckpointSaver interface ----
+
+    def _tuple(self, thread_id, ns, checkpoint_id, state):
+        checkpoint, metadata, parent_id = state.checkpoints[ns][checkpoint_id]
+        writes = state.writes.get((ns, checkpoint_id), {})
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint_id}},
+            checkpoint=self.serde.loads_typed(checkpoint),
+            metadata=self.serde.loads_typed(metadata),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": ns,
+                                            "checkpoint_id": parent_id}} if parent_id else None,
+            pending_writes=[(task_id, channel, self.serde.loads_typed(value))
+                            for task_id, channel, value, _ in writes.values()],
+        )
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        state = self._get_thread(thread_id)
+        with self.lock:
+            checkpoints = state.checkpoints.get(ns)
+            if not checkpoints:
+                return None
+            checkpoint_id = get_checkpoint_id(config) or max(checkpoints)
+            if checkpoint_id not in checkpoints:
+                return None
+            return self._tuple(thread_id, ns, checkpoint_id, state)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        if config:
+            thread_ids = [config["configurable"]["thread_id"]]
+        else:
+            self.flush()
+            with self.lock:
+                thread_ids = [row[0] for row in self.conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+                thread_ids += [t for t in self.threads if t not in thread_ids]
+        config_ns = config["configurable"].get("checkpoint_ns") if config else None
+        config_checkpoint_id = get_checkpoint_id(config) if config else None
+        before_id = get_checkpoint_id(before) if before else None
+
+        for thread_id in thread_ids:
+            state = self._get_thread(thread_id)
+            with self.lock:
+                tuples = []
+                for ns, checkpoints in state.checkpoints.items():
+                    if config_ns is not None and ns != config_ns:
+                        continue
+                    for checkpoint_id in sorted(checkpoints, reverse=True):
+                        if config_checkpoint_id and checkpoint_id != config_checkpoint_id:
+                            continue
+                        if before_id and checkpoint_id >= before_id:
+                            continue
+                        tuples.append(self._tuple(thread_id, ns, checkpoint_id, state))
+            for checkpoint_tuple in tuples:
+                if filter and not all(checkpoint_tuple.metadata.get(k) == v for k, v in filter.items()):
+                    continue
+                if limit is not None:
+                    if limit <= 0:
+                        return
+                    limit -= 1
+                yield checkpoint_tuple
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+        checkpoint_typed = self.serde.dumps_typed(checkpoint)
+        metadata_typed = self.serde.dumps_typed(metadata)
+
+        state = self._get_thread(thread_id)
+        with self.lock:
+            state.checkpoints[ns][checkpoint["id"]] = (checkpoint_typed, metadata_typed, parent_id)
+            self.write_queue.put(("checkpoint", (thread_id, ns, checkpoint["id"], parent_id,
+                                                 checkpoint_typed[0], checkpoint_typed[1],
+                                                 metadata_typed[0], metadata_typed[1])))
+            self._compact(thread_id, state, ns)
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ns, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+
+        state = self._get_thread(thread_id)
+        with self.lock:
+            existing = state.writes[(ns, checkpoint_id)]
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                if idx >= 0 and (task_id, idx) in existing:
+                    continue
+                value_typed = self.serde.dumps_typed(value)
+                existing[(task_id, idx)] = (task_id, channel, value_typed, task_path)
+                self.write_queue.put(("write", (thread_id, ns, checkpoint_id, task_id, idx, channel,
+                                                value_typed[0], value_typed[1], task_path)))
+
+    def delete_thread(self, thread_id):
+        """ Deletes all checkpoints and writes of a thread """
+        with self.lock:
+            self.threads.pop(thread_id, None)
+            self.write_queue.put(("delete_thread", (thread_id,)))
+
+    async def aget_tuple(self, config):
+        return self.get_tuple(config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        for checkpoint_tuple in self.list(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return self.delete_thread(thread_id)
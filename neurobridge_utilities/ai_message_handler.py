@@ -1,11 +1,18 @@
 import os
-import json
+import collections
+import threading
 from dotenv import load_dotenv  # Load environment variables from .env file
-from langchain_groq import ChatGroq  # Official Langchain integration for Groq
-from langchain_core.prompts import ChatPromptTemplate  # For custom prompts
+from langchain_core.messages import RemoveMessage, SystemMessage, trim_messages
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.graph.message import REMOVE_ALL_MESSAGES
 from langgraph.checkpoint.memory import MemorySaver  # Long-term memory
 from langgraph.prebuilt import create_react_agent  # Creates a fully functional AI agent
 
+from neurobridge_utilities.ai_checkpointer import DiskCheckpointSaver
+from neurobridge_utilities.config_store import PromptStore
+from neurobridge_utilities.llm_client import build_llm
+from neurobridge_utilities.response_schema import format_instructions, parse_agent_response
+
 # Load environment variables from .env
 load_dotenv()
 
@@ -17,125 +24,180 @@ if not GROQ_API_KEY:
 class AIMessageHandler:
     """Handles AI interactions with Groq's LLM and maintains message memory using Langchain."""
 
-    def __init__(self, model_name="llama-3.2-11b-vision-preview", personality_prompt=None):
+    def __init__(self, model_name="llama-3.2-11b-vision-preview", personality_prompt=None, structured_output=True,
+                 memory_file=None, fallback_model_name=None, request_timeout=20.0, max_retries=2, hedge_requests=False,
+                 max_history_tokens=2000):
         """
         Initializes the AI Message Handler with Groq's LLM and memory.
 
         Parameters:
         - model_name (str): The Groq LLM model to use. Default is `llama-3.2-11b-vision-preview`.
         - personality_prompt (str): Path to file containing personality system prompt
+        - structured_output (bool): Constrain the model to JSON output matching the Message/Action schema
+        - memory_file (str): SQLite file for persistent conversation memory. In-memory only (lost on exit) if None.
+        - fallback_model_name (str): Optional smaller/faster model used when the primary fails or is too slow.
+        - request_timeout (float): Deadline in seconds for an LLM request, including retries.
+        - max_retries (int): Retries on rate limits, server errors and timeouts.
+        - hedge_requests (bool): Fire a second request when the first is slower than the observed p95 latency.
+        - max_history_tokens (int): Approximate token budget of the conversation history kept per thread.
         """
         self.model_name = model_name
-        self.memory = MemorySaver()
-
-        # Define a structured chat prompt template
-        self.system_prompt = self.load_system_prompt(
+        self.structured_output = structured_output
+        self.max_history_tokens = max_history_tokens
+        self.memory = DiskCheckpointSaver(memory_file) if memory_file else MemorySaver()
+        self.call_info = threading.local()  # Details of the last query_llm call made from each thread
+        self.parse_counts = collections.Counter()  # Parse outcomes ('ok', 'repaired', 'fallback', 'failed') and dropped entries
+
+        # Merged system prompt, cached and hot-reloaded by the prompt store when the files change
+        self.prompt_store = PromptStore(
             hardware_file="prompts/hardware_specs.txt",
             message_template_file="prompts/message_template.txt",
-            personality_file=personality_prompt
+            personality_file=personality_prompt,
+            suffix=format_instructions() if self.structured_output else ""
         )
 
-        # Initialize Groq LLM using Langchain's official integration
-        self.llm = ChatGroq(
-            model_name=self.model_name,
+        # Initialize Groq LLM using Langchain's official integration, wrapped with deadlines, retries, hedging and a
+        # fallback model over a pooled keep-alive connection. In structured mode the API's JSON mode guarantees the
+        # reply is a syntactically valid JSON object, the schema itself is checked in parse_response
+        model_kwargs = {"response_format": {"type": "json_object"}} if self.structured_output else {}
+        self.llm = build_llm(
+            self.model_name,
+            api_key=GROQ_API_KEY,  # Uses the loaded API key
+            fallback_model_name=fallback_model_name,
             temperature=0.7,  # Controls randomness (0 = deterministic, 1 = more creative)
-            api_key=GROQ_API_KEY  # Uses the loaded API key
+            model_kwargs=model_kwargs,
+            request_timeout=request_timeout,
+            max_retries=max_retries,
+            hedge=hedge_requests
         )
 
-        # Define a structured chat prompt template
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", self.system_prompt),
-            ("user", "{input}")  # User message placeholder
-        ])
-
         # Create the agent with long-term memory. If we need it to search the internet or use custom APIs, we'll pass
-        # them along with tools but for now it can be an empty list
-        self.agent = create_react_agent(self.llm, tools=[], checkpointer=self.memory)
-
-    def load_system_prompt(self, hardware_file, message_template_file, personality_file):
+        # them along with tools but for now it can be an empty list. The system prompt is added to every model call
+        # rather than stored in the conversation, and the stored history is trimmed before each call so it stays
+        # bounded no matter how long the thread lives
+        self.agent = create_react_agent(self.llm, tools=[], checkpointer=self.memory,
+                                        prompt=self._add_system_prompt,
+                                        pre_model_hook=self._trim_history)
+
+    @property
+    def system_prompt(self):
+        """ The current merged system prompt """
+        return self.prompt_store.system_prompt
+
+    def _add_system_prompt(self, state, config):
+        # Read on every call so a hot-reloaded prompt applies to the next query. The per-call context (camera scene)
+        # goes into the system message too, so it is always current and never piles up in the stored history
+        system_prompt = self.system_prompt
+        context = config.get("configurable", {}).get("context")
+        if context:
+            system_prompt = f"{system_prompt}\n\n{context}"
+        return [SystemMessage(content=system_prompt)] + state["messages"]
+
+    def _trim_history(self, state):
+        """ Keeps the most recent turns within `max_history_tokens`, replacing the stored history with them """
+        history = [m for m in state["messages"] if not isinstance(m, SystemMessage)]  # Left by older versions
+        history = trim_messages(history, max_tokens=self.max_history_tokens, token_counter=count_tokens_approximately,
+                                strategy="last", start_on="human", include_system=False, allow_partial=False)
+        if not history:
+            history = state["messages"][-1:]  # A single oversized query is still sent
+        return {"messages": [RemoveMessage(id=REMOVE_ALL_MESSAGES)] + history}
+
+    def set_personality(self, personality_file):
         """
-        Loads and merges system prompts from multiple sources.
+        Switches the personality prompt without restarting.
 
         Parameters:
-        - hardware_file (str): Path to the hardware specifications file.
-        - message_template_file (str): Path to the message template file.
-        - personality_file (str): Path to the personality prompt file.
-
-        Returns:
-        - str: The merged system prompt.
+        - personality_file (str): Path to the new personality prompt file.
         """
-        prompt_parts = []
-
-        # Load hardware specs
-        if os.path.exists(hardware_file):
-            with open(hardware_file, "r", encoding="utf-8") as file:
-                prompt_parts.append(file.read().strip())
-        else:
-            print(f"⚠️ Warning: {hardware_file} not found.")
-
-        # Load message template
-        if os.path.exists(message_template_file):
-            with open(message_template_file, "r", encoding="utf-8") as file:
-                prompt_parts.append(file.read().strip())
-        else:
-            print(f"⚠️ Warning: {message_template_file} not found.")
-
-        # Load personality prompt (optional)
-        if personality_file and os.path.exists(personality_file):
-            with open(personality_file, "r", encoding="utf-8") as file:
-                prompt_parts.append(file.read().strip())
-        else:
-            print(f"⚠️ Warning: {personality_file} not found. Using default system prompt.")
-
-        return "\n\n".join(prompt_parts)  # Merge all into a single system prompt
-
-    def query_llm(self, query, thread_id="default_thread"):
+        self.prompt_store.set_personality(personality_file)
+
+    def query_llm(self, query, thread_id="default_thread", stream_callback=None, context=None):
         """
         Sends a user query to the AI agent with memory.
 
         Parameters:
         - query (str): The user input message.
         - thread_id (str): The unique ID for tracking conversations.
+        - stream_callback (callable): Optional function called with each generated token as it arrives.
+        - context (str): Optional extra context for this call, e.g. a summary of what the camera currently sees. It is
+          added to the system prompt, not stored in the conversation.
 
         Returns:
         - str: The AI-generated response.
         """
         # Define the configuration for the agent
-        config = {"configurable": {"thread_id": thread_id}}
-        messages = [
-            {"role": "system", "content": self.system_prompt}, # Apply the system prompt behavior
-            {"role": "user", "content": query}  # User query
-        ]
+        config = {"configurable": {"thread_id": thread_id, "context": context}}
+        messages = [{"role": "user", "content": query}]  # User query, the agent adds the system prompt
 
         # Query the agent in a streaming fashion (useful for real-time feedback)
         response = None
-        for step in self.agent.stream(
+        self.call_info.request_latency = None
+        stream_mode = ["values", "messages"] if stream_callback else ["values"]
+        for mode, step in self.agent.stream(
                 {"messages": messages},
                 config,
-                stream_mode="values"
+                stream_mode=stream_mode
         ):
+            if mode == "messages":
+                token = step[0].content  # (message chunk, metadata) pairs as the LLM generates them
+                if token:
+                    stream_callback(token)
+                continue
+
             last_message = step["messages"][-1]  # Get the last message object
 
             if isinstance(last_message, str):
                 response = last_message  # In case it's just a string, return it directly
             elif hasattr(last_message, "content"):
                 response = last_message.content  # Extract content from Langchain message object
+                self.call_info.request_latency = getattr(last_message, "response_metadata", {}).get("request_latency")
             else:
                 print("⚠️ Unexpected message format:", last_message)
                 response = "I encountered an unexpected error processing this message."
 
         return response
 
+    def last_request_latency(self):
+        """
+        Returns how long the LLM API took to answer the last query_llm call made from this thread (to the first token
+        when streaming), without the agent and retry overhead, or None if it isn't known.
+        """
+        return getattr(self.call_info, "request_latency", None)
+
     def parse_response(self, response):
-            """ Parses agent response into structured tasks """
-            try:
-                print("Received: ", response)
-                return json.loads(response) # If the format needs to be JSON
-                #return {"Message": {"message_1": response}}
-
-            except json.JSONDecodeError:
-                return {"Message": {"message_1": "Sorry, I didn't understand that."}}
-
-    def clear_memory(self):
-        """ Clears memory from Langroid agent"""
-        self.agent.memory.clear()
\ No newline at end of file
+        """
+        Parses agent response into structured tasks.
+
+        The reply is validated against the Message/Action schema, with a local repair pass for near-miss JSON. Plain
+        prose that contains no JSON at all is passed through as a message instead of being discarded.
+
+        Parameters:
+        - response (str): The raw agent response.
+
+        Returns:
+        - dict: The structured response with a "Message" and optionally an "Action" entry.
+        """
+        print("Received: ", response)
+        parsed, outcome, dropped = parse_agent_response(response or "")
+        if dropped:
+            print(f"⚠️ Skipping invalid action entries: {'; '.join(dropped)}")
+            self.parse_counts["dropped_entries"] += len(dropped)
+        if parsed is not None:
+            self.parse_counts[outcome] += 1
+            return parsed.model_dump(exclude_none=True)
+
+        if response and "{" not in response:
+            self.parse_counts["fallback"] += 1
+            return {"Message": {"message_1": response.strip()}}
+
+        self.parse_counts["failed"] += 1
+        return {"Message": {"message_1": "Sorry, I didn't understand that."}}
+
+    def clear_memory(self, thread_id="default_thread"):
+        """ Clears the conversation memory of a thread"""
+        self.memory.delete_thread(thread_id)
+
+    def close(self):
+        """ Flushes persistent memory to disk"""
+        if isinstance(self.memory, DiskCheckpointSaver):
+            self.memory.close()
\ No newline at end of file
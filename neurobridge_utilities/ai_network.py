@@ -0,0 +1,162 @@
+import json
+import asyncio
+from aiohttp import web, WSMsgType
+
+from neurobridge_utilities.ai_sessions import QueryRejected
+
+
+class NetworkInterface:
+    """ Local WebSocket/HTTP front end letting several clients hold their own conversations with one AIServer
+
+    Every client gets a session with its own LangGraph thread, queue and rate limit. Responses are streamed back as
+    JSON events: 'token' (partial LLM output), 'message', 'action', 'error', 'cancelled', 'stopped' and a final 'done'.
+
+    Endpoints:
+        GET    /ws?session_id=<id>             WebSocket, send {"query": "..."} (or plain text), receive events
+        POST   /sessions                       Create a session, returns {"session_id": ..., "thread_id": ...}
+        POST   /sessions/<id>/query            Body {"query": "..."}, streams the events as newline-delimited JSON,
+                                               404 if the session doesn't exist (or expired after being idle)
+        DELETE /sessions/<id>                  Close a session
+        POST   /stop                           Emergency stop
+        GET    /stats                          Pipeline latency statistics and counters
+
+    Parameters:
+    -----------
+        server    (AIServer) : The server the sessions are attached to
+        host           (str) : Interface to bind to, keep it on localhost unless the network is trusted
+        port           (int) : Port to listen on
+    """
+
+    def __init__(self, server, host="127.0.0.1", port=8765):
+        self.server = server
+        self.host = host
+        self.port = port
+        self.runner = None
+
+        self.app = web.Application()
+        self.app.add_routes([
+            web.get("/ws", self.handle_websocket),
+            web.post("/sessions", self.handle_create_session),
+            web.post("/sessions/{session_id}/query", self.handle_query),
+            web.delete("/sessions/{session_id}", self.handle_close_session),
+            web.post("/stop", self.handle_stop),
+            web.get("/stats", self.handle_stats),
+        ])
+
+    async def start(self):
+        """ Starts serving on the running event loop """
+        self.runner = web.AppRunner(self.app)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, self.host, self.port).start()
+        print(f"🌐 Network API listening on http://{self.host}:{self.port}")
+
+    async def stop(self):
+        """ Stops the server and closes open connections """
+        if self.runner:
+            await self.runner.cleanup()
+
+    @staticmethod
+    def _make_sink(events):
+        """ Returns a thread-safe callable that forwards events from the worker threads into an asyncio queue """
+        loop = asyncio.get_running_loop()
+        return lambda event: loop.call_soon_threadsafe(events.put_nowait, event)
+
+    def _submit(self, session, query, sink):
+        try:
+            self.server.submit_query(query, session=session, sink=sink)
+        except QueryRejected as e:
+            self.server.stats.increment(f"queries_{e.reason}")
+            sink({"type": "error", "error": e.reason})
+            sink({"type": "done"})
+
+    async def handle_websocket(self, request):
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+
+        session = self.server.create_session(request.query.get("session_id"))
+        session.connections += 1
+        events = asyncio.Queue()
+        sink = self._make_sink(events)
+        await ws.send_json({"type": "session", "session_id": session.session_id, "thread_id": session.thread_id})
+
+        async def forward_events():
+            while True:
+                await ws.send_json(await events.get())
+
+        sender = asyncio.create_task(forward_events())
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    try:
+                        query = _extract_query(msg.data)
+                    except ValueError as e:
+                        sink({"type": "error", "error": str(e)})
+                        continue
+                    self._submit(session, query, sink)
+                elif msg.type == WSMsgType.ERROR:
+                    break
+        finally:
+            sender.cancel()
+            session.connections -= 1
+            if session.connections == 0:  # Other sockets may still share this session
+                self.server.close_session(session.session_id)
+        return ws
+
+    async def handle_create_session(self, request):
+        session = self.server.create_session()
+        return web.json_response({"session_id": session.session_id, "thread_id": session.thread_id})
+
+    async def handle_query(self, request):
+        session = self.server.scheduler.get_session(request.match_info["session_id"])
+        if session is None or session.local:
+            return web.json_response({"error": "unknown session, create one with POST /sessions"}, status=404)
+        try:
+            query = _extract_query(await request.text())
+        except ValueError as e:  # Includes bodies that aren't valid UTF-8
+            return web.json_response({"error": str(e)}, status=400)
+
+        events = asyncio.Queue()
+        self._submit(session, query, self._make_sink(events))
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        while True:
+            event = await events.get()
+            await response.write((json.dumps(event) + "\n").encode())
+            if event["type"] == "done":
+                break
+        await response.write_eof()
+        return response
+
+    async def handle_close_session(self, request):
+        self.server.close_session(request.match_info["session_id"])
+        return web.json_response({"closed": True})
+
+    async def handle_stop(self, request):
+        self.server.emergency_stop()
+        return web.json_response({"stopped": True})
+
+    async def handle_stats(self, request):
+        return web.json_response({"stages": self.server.stats.summary(),
+                                  "counters": dict(self.server.stats.counters),
+                                  "sessions": len(self.server.scheduler.sessions),
+                                  "pending": self.server.scheduler.pending_count()})
+
+
+def _extract_query(data):
+    """ Accepts either a JSON object with a string 'query' field or plain text. Raises ValueError for an empty or
+    non-string query. """
+    data = data.strip()
+    if data.startswith("{"):
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = None  # Not JSON after all, taken as plain text
+        if isinstance(payload, dict):
+            query = payload.get("query")
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("'query' must be a non-empty string")
+            return query.strip()
+    if not data:
+        raise ValueError("missing query")
+    return data
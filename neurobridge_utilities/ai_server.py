@@ -2,13 +2,21 @@ import asyncio
 import collections
 import threading
 import time
+import uuid
 from mini_arm import MiniArmClient
 
 from neurobridge_utilities.ai_camera import AICamera
+from neurobridge_utilities.scene_state import SceneState
 from neurobridge_utilities.ai_message_handler import AIMessageHandler
 from neurobridge_utilities.ai_skills import AISkills
+from neurobridge_utilities.config_store import FileWatcher
+from neurobridge_utilities.ai_sessions import QueryItem, QueryRejected, ResourceArbiter, Session, SessionScheduler
+from neurobridge_utilities.intent_matcher import IntentMatcher
+from neurobridge_utilities.llm_client import LLMCancelled
 from neurobridge_utilities.ai_audio import AIAudio
 from neurobridge_utilities.keyboard_poller import KeyboardPoller, KBHit
+from neurobridge_utilities.perf_stats import PerfStats
+from neurobridge_utilities.session_recorder import SessionRecorder, RecordingSerial
 
 
 class AIServer:
@@ -17,18 +25,66 @@ class AIServer:
     Parameters:
     -----------
         object_detector_id    (str) : The model type used for object detect (example: groundingDino, YoloV5)
+        camera_id        (int, str) : Camera index or device path, or a video file / image directory for offline runs
+        camera_resolution   (tuple) : Requested capture (width, height)
+        camera_fps          (float) : Requested capture frame rate
+        camera_fourcc         (str) : Requested capture pixel format (MJPG, YUYV, ...)
+        audio_client       (object) : Optional pre-built audio client (e.g. a simulated one) used instead of AIAudio
+        robot_client       (object) : Optional pre-built robot client used instead of connecting to `robot_port`
+        enable_fast_path     (bool) : Run simple deterministic commands locally instead of sending them to the LLM
+        enable_network       (bool) : Serve the local WebSocket/HTTP API so several clients can hold conversations
+        network_host          (str) : Interface the network API binds to
+        network_port          (int) : Port the network API listens on
+        max_concurrent_queries (int) : Queries processed at the same time, at most one per session
+        session_rate_limit  (float) : Sustained queries per second allowed per network session, 0 disables the limit
+        session_burst         (int) : Queries a network session may send back to back before being rate limited
+        session_idle_timeout (float) : Seconds after which an idle network session is closed
+        memory_file           (str) : SQLite file for persistent conversation memory, None keeps it in RAM only
+        fallback_model_id     (str) : Smaller/faster LLM used when the primary fails or misses its deadline
+        request_timeout     (float) : Deadline in seconds for an LLM request, including retries
+        max_retries           (int) : LLM retries on rate limits, server errors and timeouts
+        hedge_requests       (bool) : Fire a second LLM request when the first is slower than the observed p95
+        config_store  (ConfigStore) : Optional config store watched for runtime changes (personality, rate limits, ...).
+                                      Only later changes to the file are applied, the values it holds at startup are
+                                      expected to be passed in as arguments (main.py does), so explicit ones win
+        record_file           (str) : Record inputs, LLM replies and serial traffic to this session log for replay
+        record_frames        (bool) : Also record camera frames in the session log
         """
 
+    # Parameters that can be changed through the config file without a restart
+    RUNTIME_PARAMETERS = ('verbose', 'enable_fast_path', 'session_rate_limit', 'session_burst')
+
     def __init__(self,
                  object_detector_id="IDEA-Research/grounding-dino-tiny",
                  llm_model_id= "llama-3.1-8b-instant", #"llama-3.2-11b-vision-preview",
                  enable_camera=False,
                  camera_id=0,
+                 camera_resolution=(640, 480),
+                 camera_fps=30,
+                 camera_fourcc="MJPG",
                  enable_tts=False,
                  enable_stt=False,
                  personality_prompt=None,
                  use_robot=False,
                  robot_port="COM7",
+                 audio_client=None,
+                 robot_client=None,
+                 enable_fast_path=True,
+                 enable_network=False,
+                 network_host="127.0.0.1",
+                 network_port=8765,
+                 max_concurrent_queries=4,
+                 session_rate_limit=1.0,
+                 session_burst=5,
+                 session_idle_timeout=600.0,
+                 memory_file=None,
+                 fallback_model_id=None,
+                 request_timeout=20.0,
+                 max_retries=2,
+                 hedge_requests=False,
+                 config_store=None,
+                 record_file=None,
+                 record_frames=False,
                  verbose=False):
         self.object_detector_id = object_detector_id
         self.llm_model_id = llm_model_id
@@ -46,44 +102,205 @@ class AIServer:
             'enable_stt': enable_stt,
             'verbose': verbose,
             'use_robot': use_robot,
+            'enable_fast_path': enable_fast_path,
+            'enable_network': enable_network,
+            'network_host': network_host,
+            'network_port': network_port,
+            'max_concurrent_queries': max_concurrent_queries,
+            'session_rate_limit': session_rate_limit,
+            'session_burst': session_burst,
+            'session_idle_timeout': session_idle_timeout,
             'audio_input_ready': True
         }
 
+        # Per-stage latency and event counters for the query pipeline
+        self.stats = PerfStats()
+
+        # Optional session log, replayable offline with benchmarks/replay_session.py
+        self.recorder = None
+        if record_file:
+            self.recorder = SessionRecorder(record_file, record_frames=record_frames, metadata={
+                'llm_model_id': llm_model_id,
+                'fallback_model_id': fallback_model_id,
+                'personality_prompt': personality_prompt,
+                'enable_fast_path': enable_fast_path,
+                'use_robot': use_robot or robot_client is not None,
+            })
+
         # Initialize TTS Audio client if requested
-        if self.parameters['enable_tts'] or self.parameters['enable_stt']:
+        self.audio_client = audio_client
+        if self.audio_client is None and (self.parameters['enable_tts'] or self.parameters['enable_stt']):
             self.audio_client = AIAudio(
                 use_elevenlabs=self.parameters['enable_tts'],
                 speech_model_id="eleven_flash_v2", # Fastest one I found
                 voice_id='robot_warm',
             )
 
-        # Initialize Keyboard Poller
+        # Keyboard Poller is created when the terminal interface starts, so the server can run without a TTY
         # self.poller = KeyboardPoller(self.verbose)s
-        self.kb = KBHit()
+        self.kb = None
 
         # Initialize LLM Message Handler with system prompts, pass in personality if desired
-        self.message_handler = AIMessageHandler(llm_model_id, personality_prompt)
+        self.message_handler = AIMessageHandler(llm_model_id, personality_prompt,
+                                                memory_file=memory_file,
+                                                fallback_model_name=fallback_model_id,
+                                                request_timeout=request_timeout,
+                                                max_retries=max_retries,
+                                                hedge_requests=hedge_requests)
 
         # Initialize AI Skills, handles the function/tool/robot executions
         self.skills = AISkills(self)  # Pass reference to execute skills
 
+        # Local matcher for deterministic commands that don't need the LLM
+        self.intent_matcher = IntentMatcher()
+
+        # Latest tracked detections, summarized into the system prompt of every LLM call
+        self.scene_state = SceneState()
+
         # Initialize Camera
-        self.camera = AICamera(camera_id) if self.parameters['enable_camera'] else None
+        self.camera = None
+        if self.parameters['enable_camera']:
+            self.camera = AICamera(camera_id, detector_id=object_detector_id, scene_state=self.scene_state,
+                                   recorder=self.recorder, resolution=camera_resolution, fps=camera_fps,
+                                   fourcc=camera_fourcc)
 
-        # Query queues
-        self.query_queue = collections.deque()
+        # Query queues, one per session, served round-robin. Each queued QueryItem carries the stop epoch at submission,
+        # the epoch is bumped by every emergency stop so queries and responses that predate the stop are never acted on
+        self.scheduler = SessionScheduler()
+        self.local_session = self.scheduler.add_session(
+            Session('local', thread_id='default_thread', max_pending=None, local=True))
+        self.arbiter = ResourceArbiter()
+        self.network = None
+        self.stop_epoch = 0
+        self.stop_lock = threading.Lock()  # Stops arrive from the terminal/microphone threads and the event loop
+
+        # Config and prompt files are polled for changes while the server runs
+        self.config_store = config_store
+        if self.config_store is not None:
+            self.config_store.add_listener(self.apply_config_changes)
+        self.file_watcher = None
         self.response_queue = collections.deque()
         self.agent_response = None
 
         # Load the robot client
-        self.robot = None
-        if self.parameters['use_robot']:
+        self.robot = robot_client
+        if self.robot is None and self.parameters['use_robot']:
             self.robot = MiniArmClient('MiniArm', port=robot_port, baudrate=9600)
             print("Robot connected!")
+        if self.recorder and self.robot is not None and hasattr(self.robot, 's'):
+            self.robot.s = RecordingSerial(self.robot.s, self.recorder)
+
+    def apply_config_changes(self, changed):
+        """ Applies config values that can change while the server is running. New session rate limits apply to
+        sessions created afterwards, existing sessions keep the limits they were created with.
+
+        Parameters:
+        -----------
+            changed    (dict) : Changed config keys and their new values
+        """
+        for key, value in changed.items():
+            if key == 'personality' and value:
+                self.message_handler.set_personality(value)
+            elif key in self.RUNTIME_PARAMETERS and value is not None:
+                self.parameters[key] = value
+                self.verbose = self.parameters['verbose']
+
+    def create_session(self, session_id=None):
+        """ Creates (or returns the existing) network session. Reusing a session ID resumes its conversation.
+
+        Parameters:
+        -----------
+            session_id    (str) : Optional session ID, a random one is generated if not given
+        """
+        if session_id == self.local_session.session_id:
+            session_id = None  # The operator's session can't be taken over from the network
+        session_id = session_id or uuid.uuid4().hex[:12]
+        session = self.scheduler.get_session(session_id)
+        if session is None:
+            session = self.scheduler.add_session(Session(session_id,
+                                                         rate_limit=self.parameters['session_rate_limit'],
+                                                         burst=self.parameters['session_burst']))
+            self.stats.increment('sessions_opened')
+        return session
+
+    def close_session(self, session_id):
+        """ Closes a network session, cancelling its pending queries """
+        if session_id == self.local_session.session_id:
+            return
+        for item in self.scheduler.remove_session(session_id):
+            self._cancel_item(item)
+
+    def submit_query(self, query, session=None, sink=None, source=None):
+        """ Adds a user query to the processing queue, stamped with its arrival time. Stop commands skip the queue.
+
+        Parameters:
+        -----------
+            query        (str) : The user query
+            session  (Session) : Session the query belongs to, defaults to the local terminal/microphone session
+            sink    (callable) : Optional thread-safe callable that receives the response events for this query
+            source       (str) : Where the query came from ('terminal', 'stt', 'network'), used by the session recorder
+
+        Raises QueryRejected if the session is over its rate limit or queue size.
+        """
+        received_time = time.monotonic()
+        session = session or self.local_session
+        source = source or ('terminal' if session.local else 'network')
+        if self.intent_matcher.is_stop(query):
+            if self.recorder:
+                self.recorder.record_input(query, session.session_id, source)
+            self.emergency_stop(received_time)
+            if sink:
+                sink({"type": "stopped"})
+                sink({"type": "done"})
+            return
+        try:
+            self.scheduler.submit(session, QueryItem(query, received_time, self.stop_epoch, sink))
+        except QueryRejected as e:
+            if self.recorder:
+                self.recorder.record_input(query, session.session_id, source, rejected=e.reason)
+            raise
+        if self.recorder:
+            self.recorder.record_input(query, session.session_id, source)
+
+    @staticmethod
+    def _cancel_item(item):
+        if item.sink:
+            item.sink({"type": "cancelled"})
+            item.sink({"type": "done"})
+
+    def emergency_stop(self, received_time=None):
+        """ Priority lane for stop commands. Runs on the caller's thread so it never waits behind an LLM call: drops
+        all pending queries, cancels the LLM calls in flight (freeing their sessions for new queries), invalidates
+        any response still being executed and sends an immediate halt to the robot.
+
+        Parameters:
+        -----------
+            received_time    (float) : time.monotonic() when the stop was received, used for the latency measurement
+        """
+        received_time = received_time or time.monotonic()
+        with self.stop_lock:
+            self.stop_epoch += 1
+        dropped_items = self.scheduler.clear()
+        if self.robot:
+            self.robot.stop()
+        self.message_handler.llm.cancel_requests()
+        for session, item in dropped_items:
+            self._cancel_item(item)
+        dropped = len(dropped_items)
+        self.stats.record('stop_latency', time.monotonic() - received_time)
+        self.stats.increment('emergency_stops')
+        self.stats.increment('queries_dropped', dropped)
+        print(f"🛑 Emergency stop! {dropped} pending queries dropped")
+
+    def is_preempted(self, session=None):
+        """ Returns True if an emergency stop arrived after the query the session is currently processing """
+        return (session or self.local_session).active_epoch != self.stop_epoch
 
     def terminal_interface(self):
         """ A Non-blocking terminal interface to safely collect user queries from the terminal
         """
+        if self.kb is None:
+            self.kb = KBHit()
         print("\n🚀 AI Assistant Terminal is Online! Type a command and press Enter.")
         while not self.parameters['all_stop']:
             try:
@@ -111,7 +328,7 @@ class AIServer:
                     self.parameters['all_stop'] = True
 
                 # Add to the queue
-                self.query_queue.append(user_input_str)
+                self.submit_query(user_input_str)
 
             except KeyboardInterrupt:
                 print("Ctrl+C detected, Shutting down...")
@@ -140,7 +357,7 @@ class AIServer:
                     break
 
                 # Add to the queue
-                self.query_queue.append(user_input_str)
+                self.submit_query(user_input_str, source='stt')
 
                 time.sleep(5)  # Wait 5 seconds before saying the next message
 
@@ -148,15 +365,94 @@ class AIServer:
                 print("Ctrl+C detected, Shutting down...")
                 self.parameters['all_stop'] = True
 
-    async def process_user_queries(self):
-        """ Process user queries asynchronously """
+    def handle_query(self, session, item):
+        """ Runs a single query through the fast path or the LLM and executes the result (blocking)
+
+        Parameters:
+        -----------
+            session    (Session) : The session the query belongs to
+            item     (QueryItem) : The queued query
+        """
+        self.stats.record('queue_wait', time.monotonic() - item.received_time)
+        session.active_epoch = item.epoch
+        session.active_sink = item.sink
+        try:
+            if self.is_preempted(session):
+                self.stats.increment('queries_dropped')
+                session.emit({"type": "cancelled"})
+                return
+
+            # Known commands skip the network entirely, everything else goes to the LLM
+            intent = self.intent_matcher.match(item.query) if self.parameters['enable_fast_path'] else None
+            if intent is not None:
+                self.stats.increment('fast_path_queries')
+                with self.stats.measure('skills'):
+                    self.skills.execute_response(intent, session)
+            else:
+                self.stats.increment('llm_path_queries')
+                on_token = (lambda token: session.emit({"type": "token", "token": token})) if item.sink else None
+                t0 = time.perf_counter()
+                try:
+                    with self.stats.measure('llm'):
+                        response = self.message_handler.query_llm(
+                            item.query, thread_id=session.thread_id, stream_callback=on_token,
+                            context=self.scene_state.context())
+                except LLMCancelled:
+                    self._record_llm_reply(session, None, t0, status="cancelled")
+                    print("🛑 LLM request cancelled by emergency stop")
+                    self.stats.increment('queries_dropped')
+                    session.emit({"type": "cancelled"})
+                    return
+                except Exception:
+                    self._record_llm_reply(session, None, t0, status="error")
+                    raise
+                self._record_llm_reply(session, response, t0)
+                with self.stats.measure('skills'):
+                    self.skills.execute_task(response, session)
+            self.stats.record('total', time.monotonic() - item.received_time)
+            self.stats.increment('queries_processed')
+        finally:
+            session.emit({"type": "done"})
+            session.active_sink = None
+
+    def _record_llm_reply(self, session, response, t0, status="ok"):
+        """ Records an LLM call's outcome, with the API's own latency when known (that is what the replay's fake
+        endpoint reproduces, the overhead is re-measured) and the wall time since `t0` otherwise """
+        if self.recorder:
+            latency = self.message_handler.last_request_latency()
+            self.recorder.record_llm_reply(session.thread_id, response,
+                                           latency if latency is not None else time.perf_counter() - t0, status)
+
+    async def query_worker(self):
+        """ Pulls queries from the scheduler and runs them in a worker thread, keeping the event loop responsive """
+        loop = asyncio.get_running_loop()
         while not self.parameters['all_stop']:
-            if self.query_queue:
-                query = self.query_queue.popleft()
-                response = self.message_handler.query_llm(query)
-                self.skills.execute_task(response)
+            next_query = self.scheduler.next_query()
+            if next_query is None:
+                await asyncio.sleep(0.05)
+                continue
 
-            await asyncio.sleep(0.05)
+            session, item = next_query
+            try:
+                await loop.run_in_executor(None, self.handle_query, session, item)
+            except Exception as e:
+                print(f"⚠️ Error processing query '{item.query}' from session '{session.session_id}': {e}")
+                self.stats.increment('queries_failed')
+            finally:
+                self.scheduler.release(session)
+
+    async def expire_idle_sessions(self, interval=30.0):
+        """ Periodically closes network sessions that have been idle longer than `session_idle_timeout` """
+        while not self.parameters['all_stop']:
+            await asyncio.sleep(interval)
+            for session_id in self.scheduler.expire_idle(self.parameters['session_idle_timeout']):
+                self.stats.increment('sessions_expired')
+                if self.verbose:
+                    print(f"⌛ Session '{session_id}' expired after being idle")
+
+    async def process_user_queries(self):
+        """ Process user queries asynchronously, up to `max_concurrent_queries` sessions at a time """
+        await asyncio.gather(*(self.query_worker() for _ in range(self.parameters['max_concurrent_queries'])))
 
     async def run(self):
         """ Start AI server """
@@ -167,9 +463,28 @@ class AIServer:
         else:
             threading.Thread(target=self.terminal_interface, daemon=True).start()
 
+        # Hot-reload the prompt and config files
+        self.file_watcher = FileWatcher([self.message_handler.prompt_store, self.config_store]).start()
+
+        # Serve the network API on the same event loop
+        if self.parameters['enable_network']:
+            from neurobridge_utilities.ai_network import NetworkInterface  # Optional dependency (aiohttp)
+            self.network = NetworkInterface(self, host=self.parameters['network_host'],
+                                            port=self.parameters['network_port'])
+            await self.network.start()
+            expiry_task = asyncio.create_task(self.expire_idle_sessions())
+
         await asyncio.gather(
             # self.terminal_interface(), # Not together with microphone_interface
             # self.microphone_interface(),
             self.process_user_queries(),
         ) # Run both functions concurrently until done
+
+        if self.network:
+            expiry_task.cancel()
+            await self.network.stop()
+        self.file_watcher.stop()
+        self.message_handler.close()
+        if self.recorder:
+            self.recorder.close(self.stats)
         print("🚀 AI Server shutting down...")
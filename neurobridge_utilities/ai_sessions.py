@@ -0,0 +1,193 @@
+import time
+import threading
+import contextlib
+import collections
+
+# One queued user query. `epoch` is the server's stop epoch at submission and `sink` is an optional thread-safe
+# callable receiving the response events for this query (None for the local terminal/microphone)
+QueryItem = collections.namedtuple("QueryItem", ["query", "received_time", "epoch", "sink"])
+
+
+class QueryRejected(Exception):
+    """ Raised when a session cannot accept another query. `reason` is 'rate_limited', 'queue_full' or 'closed' """
+
+    def __init__(self, reason):
+        super().__init__(f"Query rejected: {reason}")
+        self.reason = reason
+
+
+class ResourceBusy(Exception):
+    """ Raised when a shared resource stays held by another session past the arbitration timeout """
+
+
+class RateLimiter:
+    """ Token bucket limiting how fast a session can submit queries
+
+    Parameters:
+    -----------
+        rate     (float) : Sustained queries per second
+        burst      (int) : Number of queries that may be submitted back to back
+    """
+
+    def __init__(self, rate, burst=5):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_time = time.monotonic()
+
+    def allow(self):
+        """ Consumes a token and returns True, or returns False if the bucket is empty """
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.last_time) * self.rate)
+        self.last_time = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class Session:
+    """ A single conversation: its own LangGraph thread, query queue and response sink
+
+    Parameters:
+    -----------
+        session_id      (str) : Unique session identifier
+        thread_id       (str) : LangGraph thread used for the conversation memory, defaults to 'session-<session_id>'
+        rate_limit    (float) : Sustained queries per second allowed, 0 disables rate limiting
+        burst           (int) : Burst size for the rate limiter
+        max_pending     (int) : Maximum queued queries, None for unbounded
+        local          (bool) : True for the operator's terminal/microphone session
+    """
+
+    def __init__(self, session_id, thread_id=None, rate_limit=0.0, burst=5, max_pending=16, local=False):
+        self.session_id = session_id
+        self.thread_id = thread_id or f"session-{session_id}"
+        self.max_pending = max_pending
+        self.local = local
+        self.limiter = RateLimiter(rate_limit, burst) if rate_limit else None
+        self.pending = collections.deque()
+        self.busy = False  # At most one query per session is processed at a time
+        self.closed = False
+        self.active_epoch = 0
+        self.active_sink = None
+        self.created_time = time.monotonic()
+        self.last_active = self.created_time
+        self.connections = 0  # Open WebSocket connections, a connected session never expires
+
+    def emit(self, event):
+        """ Sends a response event for the query currently being processed, if it has a sink """
+        sink = self.active_sink
+        if sink is not None:
+            sink(event)
+
+
+class SessionScheduler:
+    """ Fair, round-robin scheduler across session queues
+
+    Sessions take turns: after a session's query is dispatched it moves to the back of the rotation, so one chatty
+    client cannot starve the others. A session never has more than one query in flight.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = collections.OrderedDict()
+
+    def add_session(self, session):
+        with self.lock:
+            self.sessions[session.session_id] = session
+        return session
+
+    def get_session(self, session_id):
+        with self.lock:
+            return self.sessions.get(session_id)
+
+    def remove_session(self, session_id):
+        """ Removes a session and returns its still-pending queries """
+        with self.lock:
+            session = self.sessions.pop(session_id, None)
+            if session is None:
+                return []
+            session.closed = True
+            dropped = list(session.pending)
+            session.pending.clear()
+        return dropped
+
+    def submit(self, session, item):
+        """ Queues a query for a session, raising QueryRejected if it is closed, over its rate or its queue is full """
+        with self.lock:
+            if session.closed:
+                raise QueryRejected("closed")
+            if session.max_pending is not None and len(session.pending) >= session.max_pending:
+                raise QueryRejected("queue_full")
+            if session.limiter and not session.limiter.allow():
+                raise QueryRejected("rate_limited")
+            session.pending.append(item)
+            session.last_active = time.monotonic()
+
+    def next_query(self):
+        """ Returns the next (session, QueryItem) to process and marks the session busy, or None if nothing is ready """
+        with self.lock:
+            for session_id, session in self.sessions.items():
+                if session.pending and not session.busy:
+                    session.busy = True
+                    self.sessions.move_to_end(session_id)
+                    return session, session.pending.popleft()
+        return None
+
+    def release(self, session):
+        """ Marks a session's in-flight query as finished """
+        with self.lock:
+            session.busy = False
+            session.last_active = time.monotonic()
+
+    def expire_idle(self, max_idle):
+        """ Removes remote sessions that have been idle (nothing queued or running, no connection) for `max_idle`
+        seconds and returns their IDs """
+        cutoff = time.monotonic() - max_idle
+        with self.lock:
+            expired = [session_id for session_id, session in self.sessions.items()
+                       if not session.local and not session.busy and not session.pending
+                       and not session.connections and session.last_active < cutoff]
+            for session_id in expired:
+                self.sessions.pop(session_id).closed = True
+        return expired
+
+    def clear(self):
+        """ Drops every pending query across all sessions and returns them as (session, QueryItem) pairs """
+        with self.lock:
+            dropped = [(session, item) for session in self.sessions.values() for item in session.pending]
+            for session in self.sessions.values():
+                session.pending.clear()
+        return dropped
+
+    def pending_count(self):
+        with self.lock:
+            return sum(len(session.pending) for session in self.sessions.values())
+
+
+class ResourceArbiter:
+    """ Serializes access to shared hardware (robot, camera) across sessions
+
+    Parameters:
+    -----------
+        resources    (list) : Names of the arbitrated resources
+        timeout     (float) : Default seconds to wait for a resource before giving up
+    """
+
+    def __init__(self, resources=("robot", "camera"), timeout=5.0):
+        self.timeout = timeout
+        self.locks = {name: threading.Lock() for name in resources}
+        self.owners = {name: None for name in resources}
+
+    @contextlib.contextmanager
+    def acquire(self, resource, owner, timeout=None):
+        """ Holds a resource for the duration of the block, raising ResourceBusy if it can't be had in time """
+        lock = self.locks[resource]
+        if not lock.acquire(timeout=self.timeout if timeout is None else timeout):
+            raise ResourceBusy(f"The {resource} is busy with session '{self.owners[resource]}'")
+        self.owners[resource] = owner
+        try:
+            yield
+        finally:
+            self.owners[resource] = None
+            lock.release()
@@ -1,5 +1,7 @@
 import threading
 
+from neurobridge_utilities.ai_sessions import ResourceBusy
+
 
 class AISkills:
     """ Handles robot actions based on AI responses """
@@ -7,27 +9,54 @@ class AISkills:
     def __init__(self, server):
         self.server = server
 
-    def execute_task(self, response):
+    def execute_task(self, response, session=None):
         """ Determines and executes AI-generated tasks """
-        response_data = self.server.message_handler.parse_response(response)
+        self.execute_response(self.server.message_handler.parse_response(response), session)
+
+    def execute_response(self, response_data, session=None):
+        """ Executes an already structured Message/Action response
+
+        Messages for the local session are printed and spoken, messages for network sessions are sent back as events.
+        Hardware access goes through the server's arbiter so concurrent sessions don't interleave robot commands.
+        """
+        session = session or self.server.local_session
+        if self.server.is_preempted(session):
+            print("🛑 Discarding response, an emergency stop was issued while it was being generated")
+            session.emit({"type": "cancelled"})
+            return
         for key, value in response_data.items():
             if key == "Message":
+                if not session.local:
+                    session.emit({"type": "message", "message": value})
+                    continue
                 print(f"AI Response: {value['message_1']}")
                 if self.server.parameters['enable_tts']:
                     # Combine all the data contains in the keys into a single value
                     combined_message = ""
                     for msg_key, msg_value in value.items():
                         combined_message += msg_value
-                    threading.Thread(target=self.server.audio_client.say, args=(combined_message,), daemon=True).start()
+                    threading.Thread(target=self.say, args=(combined_message,), daemon=True).start()
                     #self.server.audio_client.say(value['message_1'])
 
             if key == "Action":
+                session.emit({"type": "action", "action": value})
                 for action, details in value.items():
-                    if "skills" in details:
-                        self.execute_skill(details["skills"])
+                    try:
+                        if "skills" in details:
+                            with self.server.arbiter.acquire('camera', session.session_id):
+                                self.execute_skill(details["skills"])
 
-                    if "movements" in details:
-                        self.execute_movement(details["movements"])
+                        if "movements" in details:
+                            with self.server.arbiter.acquire('robot', session.session_id):
+                                self.execute_movement(details["movements"], session)
+                    except ResourceBusy as e:
+                        print(f"⚠️ {e}")
+                        session.emit({"type": "error", "error": str(e)})
+
+    def say(self, text):
+        """ Speaks the text through the server's audio client, recording the time spent in TTS """
+        with self.server.stats.measure('tts'):
+            self.server.audio_client.say(text)
 
     def execute_skill(self, skills):
         """ Executes hardware-specific skills """
@@ -47,9 +76,12 @@ class AISkills:
             else:
                 print(f"Unknown skill: {skill}")
 
-    def execute_movement(self, movements):
+    def execute_movement(self, movements, session=None):
         """ Executes robot-specific movements """
         for movement_name, movement_data in movements.items():
+            if self.server.is_preempted(session):
+                print("🛑 Movement cancelled by emergency stop")
+                return
             print("Executing Movement: ", movement_name)
 
             # Extract movement type
@@ -63,6 +95,13 @@ class AISkills:
 
                         # Send command to the robot if available
                         if self.server.robot:
-                            self.server.robot.move_joint(motor_id, position)
+                            with self.server.stats.measure('robot'):
+                                self.server.robot.move_joint(motor_id, position)
                     else:
-                        print(f"⚠️ Invalid move_joint parameters: {params}")
\ No newline at end of file
+                        print(f"⚠️ Invalid move_joint parameters: {params}")
+
+                elif action == "home":
+                    print("Sending home command")
+                    if self.server.robot:
+                        with self.server.stats.measure('robot'):
+                            self.server.robot.home()
\ No newline at end of file
@@ -0,0 +1,268 @@
+import os
+import sys
+import time
+import threading
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+# cv2.imdecode flags decoding a JPEG straight to 1/2, 1/4 or 1/8 of its size (scaled in the DCT, nearly free)
+_REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4),
+                         (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def _fourcc_to_str(value):
+    value = int(value)
+    return "".join(chr((value >> 8 * i) & 0xFF) for i in range(4)).strip("\x00") or "?"
+
+
+def _decode_flag(source_size, output_size):
+    """ Picks the most reduced JPEG decode that is still at least `output_size` """
+    if not output_size or not source_size:
+        return cv2.IMREAD_COLOR
+    for factor, flag in _REDUCED_DECODE_FLAGS:
+        if source_size[0] // factor >= output_size[0] and source_size[1] // factor >= output_size[1]:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+class ImageDirectoryReader:
+    """ Minimal `cv2.VideoCapture` look-alike reading the (sorted) images of a directory as raw encoded bytes
+
+    Parameters:
+    -----------
+        directory    (str) : Directory holding the images
+    """
+
+    def __init__(self, directory):
+        self.files = sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                            if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+
+    def isOpened(self):
+        return bool(self.files)
+
+    def read(self):
+        if self.index >= len(self.files):
+            return False, None
+        with open(self.files[self.index], "rb") as file:
+            data = file.read()
+        self.index += 1
+        return True, data
+
+    def rewind(self):
+        self.index = 0
+
+    def release(self):
+        self.files = []
+
+
+class CameraCapture:
+    """ Low-latency frame source for the camera, a video file or a directory of images
+
+    Live cameras are opened with the V4L2 backend on Linux and asked for the requested FOURCC (MJPEG by default, which
+    lets USB cameras deliver high resolutions at full frame rate), resolution, frame rate and a one-frame driver
+    buffer; the negotiated values are read back and reported. MJPEG frames are grabbed undecoded and decoded straight
+    to `output_size` with OpenCV's reduced JPEG decoding, so frames are decoded and scaled in one step. With `rgb`
+    the frames are delivered in RGB order, as detectors expect, converted during decoding where OpenCV supports it.
+
+    A background thread keeps only the latest frame, so consumers (display, detector) always get a fresh frame and
+    never share the capture device. File and directory sources are paced at `fps` to behave like a live camera, and
+    can be looped for offline runs.
+
+    Parameters:
+    -----------
+        source      (int, str) : Camera index or device path, a video file, or a directory of images
+        width            (int) : Requested capture width
+        height           (int) : Requested capture height
+        fps            (float) : Requested camera frame rate, also the playback rate for file and directory sources
+        fourcc           (str) : Requested pixel format, e.g. 'MJPG' or 'YUYV', None keeps the driver default
+        output_size    (tuple) : (width, height) frames are delivered at, or a function mapping the source
+                                 (width, height) to it (e.g. the detector's input size), None keeps the capture size.
+                                 Frames are never scaled up, a larger output size keeps the capture size
+        rgb             (bool) : Deliver RGB instead of BGR frames
+        loop            (bool) : Restart file and directory sources when they end
+    """
+
+    def __init__(self, source=0, width=640, height=480, fps=30, fourcc="MJPG", output_size=None, rgb=False,
+                 loop=True):
+        if isinstance(source, str) and source.isdigit():
+            source = int(source)
+        self.source = source
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fourcc = fourcc
+        self.output_size_fn = output_size if callable(output_size) else None
+        self.output_size = tuple(output_size) if output_size and not self.output_size_fn else None
+        self.source_size = None
+        self.rgb = rgb
+        self.loop = loop
+        self.is_file = isinstance(source, str) and os.path.isfile(source)
+        self.is_directory = isinstance(source, str) and os.path.isdir(source)
+        self.cap = None
+        self.raw_jpeg = False  # Frames arrive as undecoded JPEG bytes
+        self.decode_flag = cv2.IMREAD_COLOR
+        self.condition = threading.Condition()
+        self.frame = None
+        self.frame_id = 0
+        self.running = False
+        self.thread = None
+
+    def open(self):
+        """ Opens the source and negotiates the capture format. Returns True on success. """
+        if self.is_directory:
+            self.cap = ImageDirectoryReader(self.source)
+            self.raw_jpeg = True
+        elif self.is_file:
+            self.cap = cv2.VideoCapture(self.source)
+            self.fps = self.cap.get(cv2.CAP_PROP_FPS) or self.fps
+            self._set_source_size(int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                  int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+        else:
+            self._open_camera()
+
+        if not self.cap.isOpened():
+            print(f"⚠️ Could not open camera source {self.source}")
+            return False
+        return True
+
+    def _open_camera(self):
+        # V4L2 applies settings in order and the pixel format decides which sizes and rates are available
+        backend = cv2.CAP_V4L2 if sys.platform.startswith("linux") else cv2.CAP_ANY
+        self.cap = cv2.VideoCapture(self.source, backend)
+        if not self.cap.isOpened():
+            return
+        if self.fourcc:
+            self.cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*self.fourcc))
+        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Don't queue stale frames in the driver
+
+        fourcc = _fourcc_to_str(self.cap.get(cv2.CAP_PROP_FOURCC))
+        width, height = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        print(f"📷 Camera {self.source}: {fourcc} {width}x{height} @ {fps:.0f} fps")
+        if self.fourcc and fourcc != self.fourcc:
+            print(f"⚠️ Camera doesn't support {self.fourcc}, using {fourcc}")
+
+        self._set_source_size(width, height)
+
+        # Grab MJPEG frames undecoded so they can be decoded directly at the output size
+        if fourcc == "MJPG" and self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 0):
+            self.raw_jpeg = True
+            self.decode_flag = _decode_flag(self.source_size, self.output_size)
+
+    def _set_source_size(self, width, height):
+        """ Records the source resolution and resolves the output size from it """
+        self.source_size = (width, height)
+        if not width or not height:
+            return
+        if self.output_size_fn is not None:
+            self.output_size = tuple(self.output_size_fn(width, height))
+        if self.output_size and (self.output_size[0] >= width or self.output_size[1] >= height):
+            self.output_size = None  # Upscaling only costs time, consumers that need larger frames scale themselves
+        if self.output_size:
+            print(f"📷 Decoding {width}x{height} frames to {self.output_size[0]}x{self.output_size[1]}")
+
+    def _decode(self, data):
+        """ Turns whatever the source returned into a BGR frame of `output_size`, or None """
+        rgb = False  # Whether the frame is already in RGB order
+        if not self.raw_jpeg:
+            frame = data
+        else:
+            buffer = np.frombuffer(data, dtype=np.uint8) if isinstance(data, bytes) else data.reshape(-1)
+            flag = self.decode_flag
+            if self.rgb and flag == cv2.IMREAD_COLOR and self.source_size and hasattr(cv2, "IMREAD_COLOR_RGB"):
+                flag, rgb = cv2.IMREAD_COLOR_RGB, True  # Full-size decode can produce RGB directly (OpenCV >= 4.10)
+            frame = cv2.imdecode(buffer, flag)
+            if frame is None:
+                if not self.is_directory:
+                    # The backend returned something other than JPEG bytes, let it convert the frames itself
+                    print("⚠️ Raw MJPEG capture not supported by this backend, decoding in the driver")
+                    self.raw_jpeg = False
+                    self.cap.set(cv2.CAP_PROP_CONVERT_RGB, 1)
+                return None
+            if self.is_directory and self.source_size is None:
+                # Directory images are decoded at full size once to learn their resolution
+                self._set_source_size(frame.shape[1], frame.shape[0])
+                self.decode_flag = _decode_flag(self.source_size, self.output_size)
+        if self.output_size and (frame.shape[1], frame.shape[0]) != self.output_size:
+            frame = cv2.resize(frame, self.output_size, interpolation=cv2.INTER_AREA)
+        if self.rgb and not rgb:
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)  # After resizing, on the smaller image
+        return frame
+
+    def _rewind(self):
+        if self.is_directory:
+            self.cap.rewind()
+        else:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _grab_loop(self):
+        offline = self.is_file or self.is_directory
+        interval = 1.0 / self.fps if offline and self.fps else 0.0
+        next_time = time.monotonic()
+        frames_since_rewind = 0
+        while self.running:
+            ret, data = self.cap.read()
+            if not ret:
+                if offline and self.loop and frames_since_rewind:
+                    self._rewind()
+                    frames_since_rewind = 0
+                    continue
+                if offline:
+                    break
+                time.sleep(0.01)
+                continue
+            frames_since_rewind += 1
+            frame = self._decode(data)
+            if frame is None:
+                continue
+            if interval:
+                next_time += interval
+                time.sleep(max(0.0, next_time - time.monotonic()))
+            with self.condition:
+                self.frame = frame
+                self.frame_id += 1
+                self.condition.notify_all()
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def start(self):
+        """ Opens the source and starts grabbing frames in the background. Returns self, or None on failure. """
+        if not self.open():
+            return None
+        self.running = True
+        self.thread = threading.Thread(target=self._grab_loop, daemon=True)
+        self.thread.start()
+        return self
+
+    def get_frame(self, after_id=0, timeout=1.0):
+        """
+        Returns the latest frame, waiting for one newer than `after_id`.
+
+        Parameters:
+        - after_id (int): ID of the last frame the caller has seen.
+        - timeout (float): Seconds to wait for a new frame.
+
+        Returns:
+        - tuple or None: (frame_id, frame), or None if no new frame arrived in time or the source ended.
+        """
+        with self.condition:
+            if not self.condition.wait_for(lambda: self.frame_id > after_id or not self.running, timeout):
+                return None
+            if self.frame_id <= after_id:
+                return None
+            return self.frame_id, self.frame
+
+    def stop(self):
+        """ Stops grabbing and releases the source """
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+        if self.cap:
+            self.cap.release()
@@ -1,23 +1,52 @@
+import re
 import pathlib
 
+# `key = value` or YAML-style `key: value`, whichever separator comes first
+_CONFIG_LINE = re.compile(r"^([A-Za-z_][\w.\-]*)\s*[=:]\s*(.*)$")
+
+
 def parse_config_file(config_file):
-    """ Helper function to parse config.yaml file"""
+    """ Helper function to parse config.yaml file (flat `key = value` or `key: value` lines)
+
+    Malformed lines are reported and skipped, so a typo can't take down startup or a hot reload.
+    """
     # Dictionary to store the key-value pairs
     config_data = {}
     config_filepath = pathlib.Path(config_file)
     with open(config_filepath, 'r') as file:
-        for line in file:
+        for line_number, line in enumerate(file, 1):
             # Strip whitespace and ignore empty lines or comments
             line = line.strip()
             if not line or line.startswith('#'):
                 continue
 
-            # Split the line into key and value at the first '='
-            key, value = line.split('=', 1)
+            match = _CONFIG_LINE.match(line)
+            if match is None:
+                print(f"⚠️ Skipping malformed line {line_number} in {config_file}: {line}")
+                continue
+            key, value = match.groups()
             # Make sure to remove any '#' if they are in the line as comments
             value = value.split('#')[0]
 
-            config_data[key.strip()] = value.strip()
+            config_data[key] = value.strip()
 
     return config_data
 
+
+def parse_value(value):
+    """ Helper function to convert a raw config string into a bool, None, int, float or (unquoted) string"""
+    lowered = value.lower()
+    if lowered in ('true', 'yes', 'on'):
+        return True
+    if lowered in ('false', 'no', 'off'):
+        return False
+    if lowered in ('none', 'null', ''):
+        return None
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in ('"', "'"):
+        return value[1:-1]
+    return value
@@ -0,0 +1,187 @@
+import os
+import hashlib
+import threading
+
+from neurobridge_utilities.config_reader import parse_config_file, parse_value
+
+
+def _file_signature(path):
+    """ Returns (mtime_ns, size) for a file, or None if it doesn't exist """
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigStore:
+    """ Loads a `key = value` (or `key: value`) config file once and caches the typed values, reloading only when
+    the file changes
+
+    Parameters:
+    -----------
+        config_file    (str) : Path to the config file
+    """
+
+    def __init__(self, config_file):
+        self.config_file = config_file
+        self.values = {}
+        self.signature = None
+        self.listeners = []
+        self.reload()
+
+    def get(self, key, default=None):
+        return self.values.get(key, default)
+
+    def add_listener(self, callback):
+        """ Registers a callback called with a dict of the changed keys and their new values after a reload """
+        self.listeners.append(callback)
+
+    def reload(self):
+        """ Re-reads the config file and returns the keys whose values changed """
+        self.signature = _file_signature(self.config_file)
+        values = {}
+        if self.signature is not None:
+            values = {key: parse_value(value) for key, value in parse_config_file(self.config_file).items()}
+        changed = {key: value for key, value in values.items() if self.values.get(key) != value}
+        changed.update({key: None for key in self.values if key not in values})
+        self.values = values
+        return changed
+
+    def refresh(self):
+        """ Reloads the file if it changed on disk and notifies the listeners. Returns True if anything changed. """
+        if _file_signature(self.config_file) == self.signature:
+            return False
+        changed = self.reload()
+        if changed:
+            print(f"🔄 Config reloaded from {self.config_file}: {', '.join(sorted(changed))}")
+            for callback in self.listeners:
+                callback(changed)
+        return bool(changed)
+
+
+class PromptStore:
+    """ Merges the hardware, message template and personality prompts once and caches the result with its hash
+
+    The merged prompt is rebuilt only when one of the files changes on disk (or the personality is switched), so the
+    system prompt can be hot-swapped without restarting the process or re-creating the LLM client and agent.
+
+    Parameters:
+    -----------
+        hardware_file            (str) : Path to the hardware specifications file
+        message_template_file    (str) : Path to the message template file
+        personality_file         (str) : Path to the personality prompt file (optional)
+        suffix                   (str) : Text appended after the files, e.g. output format instructions
+    """
+
+    def __init__(self, hardware_file, message_template_file, personality_file=None, suffix=""):
+        self.hardware_file = hardware_file
+        self.message_template_file = message_template_file
+        self.personality_file = personality_file
+        self.suffix = suffix
+        self.system_prompt = ""
+        self.prompt_hash = None
+        self.signatures = None
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.reload()
+
+    @property
+    def files(self):
+        return [self.hardware_file, self.message_template_file, self.personality_file]
+
+    def add_listener(self, callback):
+        """ Registers a callback called with the new system prompt after it changes """
+        self.listeners.append(callback)
+
+    def reload(self):
+        """ Re-reads and merges the prompt files. Returns True if the merged prompt changed. """
+        with self.lock:
+            self.signatures = [_file_signature(path) for path in self.files]
+            prompt_parts = []
+
+            # Load hardware specs
+            if os.path.exists(self.hardware_file):
+                with open(self.hardware_file, "r", encoding="utf-8") as file:
+                    prompt_parts.append(file.read().strip())
+            else:
+                print(f"⚠️ Warning: {self.hardware_file} not found.")
+
+            # Load message template
+            if os.path.exists(self.message_template_file):
+                with open(self.message_template_file, "r", encoding="utf-8") as file:
+                    prompt_parts.append(file.read().strip())
+            else:
+                print(f"⚠️ Warning: {self.message_template_file} not found.")
+
+            # Load personality prompt (optional)
+            if self.personality_file and os.path.exists(self.personality_file):
+                with open(self.personality_file, "r", encoding="utf-8") as file:
+                    prompt_parts.append(file.read().strip())
+            else:
+                print(f"⚠️ Warning: {self.personality_file} not found. Using default system prompt.")
+
+            if self.suffix:
+                prompt_parts.append(self.suffix)
+
+            system_prompt = "\n\n".join(prompt_parts)  # Merge all into a single system prompt
+            prompt_hash = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:12]
+            if prompt_hash == self.prompt_hash:
+                return False
+            self.system_prompt = system_prompt
+            self.prompt_hash = prompt_hash
+
+        for callback in self.listeners:
+            callback(system_prompt)
+        return True
+
+    def set_personality(self, personality_file):
+        """ Switches to another personality prompt file """
+        self.personality_file = personality_file
+        return self.reload()
+
+    def refresh(self):
+        """ Reloads the prompt if any of the files changed on disk. Returns True if the merged prompt changed. """
+        if [_file_signature(path) for path in self.files] == self.signatures:
+            return False
+        changed = self.reload()
+        if changed:
+            print(f"🔄 System prompt reloaded (hash {self.prompt_hash})")
+        return changed
+
+
+class FileWatcher:
+    """ Polls config and prompt stores for changes in a background thread
+
+    Uses mtime polling rather than inotify so it behaves the same on Linux and Windows. Each poll is only a few
+    `os.stat` calls, the files are re-read only when they actually changed.
+
+    Parameters:
+    -----------
+        stores             (list) : Objects with a `refresh()` method (ConfigStore, PromptStore)
+        poll_interval     (float) : Seconds between polls
+    """
+
+    def __init__(self, stores, poll_interval=1.0):
+        self.stores = [store for store in stores if store is not None]
+        self.poll_interval = poll_interval
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while not self.stop_event.wait(self.poll_interval):
+            for store in self.stores:
+                try:
+                    store.refresh()
+                except Exception as e:
+                    print(f"⚠️ Error reloading {type(store).__name__}: {e}")
@@ -0,0 +1,106 @@
+import re
+
+
+# Politeness and filler around a command that should not stop it from matching
+_PREFIX_RE = re.compile(r"^(?:(?:please|hey|ok|okay|robot|now|can you|could you|would you|will you)\s+)*")
+_SUFFIX_RE = re.compile(r"(?:\s+(?:please|now|for me|thanks|thank you))*$")
+_PUNCTUATION_RE = re.compile(r"[^\w\s.\-]|(?<!\d)\.|\.(?!\d)")
+
+# Commands that must halt the robot immediately, checked at ingest before anything is queued
+_STOP_RE = re.compile(r"(?:emergency\s+)?(?:stop|halt|freeze|abort)(?:\s+(?:it|everything|moving|now|the\s+(?:robot|arm)))?"
+                      r"|e[\s\-]?stop|all\s+stop")
+
+
+class IntentMatcher:
+    """ Fast path mapping simple, deterministic robot commands straight to actions, without an LLM round-trip
+
+    Each rule is a compiled pattern that must match the whole (normalized) query, so anything conversational or
+    ambiguous falls through to the LLM. Matches are returned in the same Message/Action format the LLM produces, so
+    they run through AISkills unchanged.
+
+    Parameters:
+    -----------
+        gripper_open_value      (float) : Gripper position used for "open gripper"
+        gripper_closed_value    (float) : Gripper position used for "close gripper"
+    """
+
+    def __init__(self, gripper_open_value=0, gripper_closed_value=90):
+        self.gripper_open_value = gripper_open_value
+        self.gripper_closed_value = gripper_closed_value
+        self.rules = [
+            (re.compile(r"(?:go\s+)?(?:back\s+)?(?:to\s+)?(?:the\s+)?home(?:\s+position)?|return\s+(?:to\s+)?home"),
+             self._home),
+            (re.compile(r"open\s+(?:the\s+|your\s+)?(?:gripper|claw|hand)"), self._open_gripper),
+            (re.compile(r"close\s+(?:the\s+|your\s+)?(?:gripper|claw|hand)"), self._close_gripper),
+            (re.compile(r"(?:turn|switch)\s+on\s+(?:the\s+)?camera|(?:turn|switch)\s+(?:the\s+)?camera\s+on"
+                        r"|(?:start|enable)\s+(?:the\s+)?camera|camera\s+on"), self._camera_on),
+            (re.compile(r"(?:turn|switch)\s+off\s+(?:the\s+)?camera|(?:turn|switch)\s+(?:the\s+)?camera\s+off"
+                        r"|(?:stop|disable)\s+(?:the\s+)?camera|camera\s+off"), self._camera_off),
+            (re.compile(r"(?:move|turn|rotate|set)\s+(?:the\s+)?(?P<joint>base|shoulder|elbow|gripper|(?:joint|motor)\s+[1-6])"
+                        r"\s+(?:to\s+)?(?P<value>-?\d+(?:\.\d+)?)(?:\s+degrees?)?"), self._move_joint),
+        ]
+
+    @staticmethod
+    def normalize(query):
+        """ Lowercases the query and strips punctuation and filler words """
+        text = " ".join(_PUNCTUATION_RE.sub(" ", query.lower()).split())
+        text = _PREFIX_RE.sub("", text)
+        return _SUFFIX_RE.sub("", text)
+
+    def is_stop(self, query):
+        """ Returns True if the query is a stop/halt command that should take the priority lane """
+        return _STOP_RE.fullmatch(self.normalize(query)) is not None
+
+    def match(self, query):
+        """
+        Matches a user query against the known commands.
+
+        Parameters:
+        - query (str): The user query.
+
+        Returns:
+        - dict or None: A Message/Action response ready for AISkills, or None if the query needs the LLM.
+        """
+        text = self.normalize(query)
+        if not text:
+            return None
+        for pattern, handler in self.rules:
+            m = pattern.fullmatch(text)
+            if m:
+                return handler(m)
+        return None
+
+    @staticmethod
+    def _response(message, movements=None, skills=None):
+        action = {}
+        if skills:
+            action["skills"] = skills
+        if movements:
+            action["movements"] = movements
+        response = {"Message": {"message_1": message}}
+        if action:
+            response["Action"] = {"action_1": action}
+        return response
+
+    def _home(self, m):
+        return self._response("Going home.", movements={"home": {"home": {}}})
+
+    def _open_gripper(self, m):
+        return self._response("Opening the gripper.", movements={
+            "open_gripper": {"move_joint": {"motor": "gripper", "value": self.gripper_open_value}}})
+
+    def _close_gripper(self, m):
+        return self._response("Closing the gripper.", movements={
+            "close_gripper": {"move_joint": {"motor": "gripper", "value": self.gripper_closed_value}}})
+
+    def _camera_on(self, m):
+        return self._response("Turning the camera on.", skills={"camera_enable": {}})
+
+    def _camera_off(self, m):
+        return self._response("Turning the camera off.", skills={"camera_disable": {}})
+
+    def _move_joint(self, m):
+        joint = m.group("joint").split()[-1]  # 'joint 3' -> '3'
+        value = float(m.group("value"))
+        return self._response(f"Moving the {m.group('joint')} to {value:g}.", movements={
+            f"move_{joint}": {"move_joint": {"motor": joint, "value": value}}})
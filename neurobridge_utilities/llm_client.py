@@ -0,0 +1,327 @@
+import time
+import queue
+import random
+import threading
+import concurrent.futures
+from typing import Any, Optional
+
+import httpx
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from langchain_groq import ChatGroq
+
+from neurobridge_utilities.perf_stats import PerfStats
+
+# HTTP status codes worth retrying: timeouts, conflicts, rate limits and server errors
+_RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Seconds between checks for a cancellation while waiting on a request
+_CANCEL_POLL = 0.05
+
+
+class LLMCancelled(Exception):
+    """ Raised by an in-flight LLM call when `ResilientChatModel.cancel_requests()` is called """
+
+
+def is_retryable(error):
+    """ Returns True for transient LLM API errors (rate limits, 5xx, timeouts, dropped connections) """
+    if isinstance(error, (TimeoutError, httpx.TimeoutException, httpx.TransportError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    # The groq SDK wraps transport failures in APIConnectionError/APITimeoutError, which have no status code
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(error):
+    """ Seconds requested by a Retry-After header on the error response, if any """
+    response = getattr(error, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class ResilientChatModel(BaseChatModel):
+    """ Chat model wrapper adding deadlines, jittered retries, hedged requests and a fallback model
+
+    The wrapped models are plain `ChatGroq` instances sharing one pooled keep-alive HTTP client. Each call gets an
+    overall deadline; transient failures are retried with jittered exponential backoff (honouring Retry-After) until
+    the deadline or `max_retries` is reached, after which the fallback model is tried. With hedging enabled, a
+    second identical request is fired if the first hasn't answered after the observed p95 latency, and whichever
+    answers first wins.
+
+    The time the API took to answer (to the first token when streaming) is added to the reply's response metadata as
+    `request_latency`, without the retries, backoff and agent overhead around it.
+
+    Streaming calls are retried only until the first token arrives and are never hedged. The deadline also applies
+    while waiting for each token, so a stream that stalls midway fails instead of hanging.
+
+    `cancel_requests()` makes every call in flight raise LLMCancelled within `_CANCEL_POLL` seconds, so the caller is
+    freed right away; the abandoned HTTP requests finish in the background.
+    """
+
+    primary: BaseChatModel
+    fallback: Optional[BaseChatModel] = None
+    request_timeout: float = 20.0
+    fallback_timeout: float = 10.0
+    max_retries: int = 2
+    backoff_base: float = 0.25
+    backoff_max: float = 4.0
+    hedge: bool = False
+    hedge_delay: float = 1.0  # Used until enough latency samples have been collected for a p95
+    hedge_min_samples: int = 20
+
+    _stats: Any = PrivateAttr(default=None)
+    _executor: Any = PrivateAttr(default=None)
+    _cancel_condition: Any = PrivateAttr(default=None)
+    _generation: int = PrivateAttr(default=0)
+
+    def model_post_init(self, __context):
+        super().model_post_init(__context)
+        self._stats = PerfStats(max_samples=1000)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+        self._cancel_condition = threading.Condition()
+
+    @property
+    def stats(self):
+        """ Attempt latencies and retry/hedge/fallback counters """
+        return self._stats
+
+    @property
+    def _llm_type(self):
+        return "resilient-chat"
+
+    @property
+    def _identifying_params(self):
+        return {"primary": getattr(self.primary, "model_name", None),
+                "fallback": getattr(self.fallback, "model_name", None)}
+
+    def bind_tools(self, tools, **kwargs):
+        """ Binds tools as request parameters, forwarded to whichever model ends up answering """
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def cancel_requests(self):
+        """ Cancels every call currently in flight, they raise LLMCancelled. Calls started afterwards are unaffected. """
+        with self._cancel_condition:
+            self._generation += 1
+            self._cancel_condition.notify_all()
+
+    def _check_cancelled(self, generation):
+        if self._generation != generation:
+            raise LLMCancelled("LLM request cancelled")
+
+    def _wait(self, futures, timeout, generation):
+        """ `concurrent.futures.wait` for the first future to complete, checking for cancellation while waiting """
+        deadline = time.monotonic() + timeout
+        while True:
+            self._check_cancelled(generation)
+            remaining = deadline - time.monotonic()
+            done, pending = concurrent.futures.wait(futures, timeout=max(0.0, min(remaining, _CANCEL_POLL)),
+                                                    return_when=concurrent.futures.FIRST_COMPLETED)
+            if done or remaining <= _CANCEL_POLL:
+                return done, pending
+
+    def current_hedge_delay(self):
+        """ The hedge delay: observed p95 attempt latency once enough samples exist, `hedge_delay` before that """
+        if self._stats.count("llm_successes") >= self.hedge_min_samples:
+            return self._stats.percentile("llm_attempt", 95)
+        return self.hedge_delay
+
+    def _timed_generate(self, model, messages, stop, kwargs):
+        t0 = time.perf_counter()
+        result = model._generate(messages, stop=stop, **kwargs)
+        latency = time.perf_counter() - t0
+        if model is self.primary:
+            self._stats.record("llm_attempt", latency)
+            self._stats.increment("llm_successes")
+        for generation in result.generations:
+            generation.message.response_metadata["request_latency"] = latency
+        return result
+
+    def _attempt(self, messages, stop, kwargs, timeout, generation):
+        """ One (possibly hedged) request to the primary model, bounded by `timeout` seconds """
+        futures = [self._executor.submit(self._timed_generate, self.primary, messages, stop, kwargs)]
+        deadline = time.monotonic() + timeout
+        if self.hedge:
+            done, _ = self._wait(futures, min(self.current_hedge_delay(), timeout), generation)
+            if not done:
+                self._stats.increment("llm_hedges")
+                futures.append(self._executor.submit(self._timed_generate, self.primary, messages, stop, kwargs))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            done, pending = self._wait(pending, remaining, generation)
+            for future in done:
+                if future.exception() is None:
+                    if future is not futures[0]:
+                        self._stats.increment("llm_hedge_wins")
+                    return future.result()
+                error = future.exception()
+        # Losing or timed-out requests finish in the background, bounded by the HTTP client timeout
+        if error is not None and not pending:
+            raise error
+        raise TimeoutError(f"LLM request exceeded {timeout:.1f}s")
+
+    def _backoff(self, attempt, error, remaining, generation):
+        delay = _retry_after(error)
+        if delay is None:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt) * random.uniform(0.5, 1.5)
+        with self._cancel_condition:
+            self._cancel_condition.wait_for(lambda: self._generation != generation,
+                                            timeout=max(0.0, min(delay, remaining)))
+        self._check_cancelled(generation)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        generation = self._generation
+        deadline = time.monotonic() + self.request_timeout
+        error = None
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                return self._attempt(messages, stop, kwargs, remaining, generation)
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                error = e
+                self._stats.increment("llm_errors")
+                if attempt < self.max_retries:
+                    self._stats.increment("llm_retries")
+                    self._backoff(attempt, e, deadline - time.monotonic(), generation)
+
+        if self.fallback is not None:
+            print(f"⚠️ Primary LLM failed ({error or 'deadline exceeded'}), using fallback model")
+            self._stats.increment("llm_fallbacks")
+            future = self._executor.submit(self._timed_generate, self.fallback, messages, stop, kwargs)
+            done, _ = self._wait([future], self.fallback_timeout, generation)
+            if not done:
+                raise TimeoutError(f"Fallback LLM request exceeded {self.fallback_timeout:.1f}s")
+            return future.result()
+        raise error or TimeoutError(f"LLM request exceeded {self.request_timeout:.1f}s")
+
+    def _bounded_stream(self, model, messages, stop, kwargs, deadline, generation):
+        """ Yields the chunks of `model._stream`, raising TimeoutError if the deadline passes while waiting for one
+        and LLMCancelled if the call is cancelled """
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        end = object()
+
+        def produce():
+            # The HTTP read itself can't be interrupted, an abandoned stream ends at the client's read timeout
+            t0 = time.perf_counter()
+            first = True
+            try:
+                for chunk in model._stream(messages, stop=stop, **kwargs):
+                    if cancelled.is_set():
+                        return
+                    if first:
+                        chunk.message.response_metadata["request_latency"] = time.perf_counter() - t0
+                        first = False
+                    chunks.put(chunk)
+                chunks.put(end)
+            except Exception as e:
+                chunks.put(e)
+
+        threading.Thread(target=produce, daemon=True).start()
+        try:
+            while True:
+                self._check_cancelled(generation)
+                remaining = deadline - time.monotonic()
+                try:
+                    item = chunks.get(timeout=max(0.0, min(remaining, _CANCEL_POLL)))
+                except queue.Empty:
+                    if remaining <= _CANCEL_POLL:
+                        raise TimeoutError("LLM stream exceeded its deadline")
+                    continue
+                if item is end:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        # Token callbacks are emitted by BaseChatModel for the chunks yielded here, so the inner model gets no
+        # run_manager (otherwise every token would be reported twice)
+        generation = self._generation
+        deadline = time.monotonic() + self.request_timeout
+        error = None
+        for attempt in range(self.max_retries + 1):
+            if time.monotonic() >= deadline:
+                break
+            started = False
+            try:
+                for chunk in self._bounded_stream(self.primary, messages, stop, kwargs, deadline, generation):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not is_retryable(e):
+                    raise
+                error = e
+                self._stats.increment("llm_errors")
+                if attempt < self.max_retries:
+                    self._stats.increment("llm_retries")
+                    self._backoff(attempt, e, deadline - time.monotonic(), generation)
+
+        if self.fallback is None:
+            raise error or TimeoutError(f"LLM request exceeded {self.request_timeout:.1f}s")
+        print(f"⚠️ Primary LLM failed ({error or 'deadline exceeded'}), using fallback model")
+        self._stats.increment("llm_fallbacks")
+        yield from self._bounded_stream(self.fallback, messages, stop, kwargs,
+                                        time.monotonic() + self.fallback_timeout, generation)
+
+
+def build_llm(model_name, api_key, fallback_model_name=None, temperature=0.7, model_kwargs=None,
+              request_timeout=20.0, max_retries=2, hedge=False, max_connections=10):
+    """
+    Builds the LLM client used by the message handler.
+
+    Parameters:
+    - model_name (str): The primary Groq model.
+    - api_key (str): Groq API key.
+    - fallback_model_name (str): Optional (smaller/faster) model used when the primary fails or misses its deadline.
+    - temperature (float): Sampling temperature.
+    - model_kwargs (dict): Extra request parameters, e.g. the JSON response format.
+    - request_timeout (float): Overall deadline in seconds for a request, including retries and hedges.
+    - max_retries (int): Retries on rate limits, server errors and timeouts.
+    - hedge (bool): Fire a second request if the first is slower than the observed p95.
+    - max_connections (int): Size of the keep-alive HTTP connection pool.
+
+    Returns:
+    - ResilientChatModel: The wrapped chat model.
+    """
+    # One pooled keep-alive client shared by every request and both models, so TLS handshakes are paid once
+    http_client = httpx.Client(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                            keepalive_expiry=120.0),
+        timeout=httpx.Timeout(request_timeout, connect=5.0),
+    )
+
+    def groq_model(name):
+        return ChatGroq(
+            model_name=name,
+            temperature=temperature,
+            api_key=api_key,
+            model_kwargs=dict(model_kwargs or {}),
+            http_client=http_client,
+            request_timeout=request_timeout,
+            max_retries=0,  # Retries are handled by the wrapper, within the deadline
+        )
+
+    return ResilientChatModel(
+        primary=groq_model(model_name),
+        fallback=groq_model(fallback_model_name) if fallback_model_name else None,
+        request_timeout=request_timeout,
+        fallback_timeout=request_timeout / 2,
+        max_retries=max_retries,
+        hedge=hedge,
+    )
@@ -0,0 +1,125 @@
+import math
+import time
+import threading
+import contextlib
+import collections
+
+
+class PerfStats:
+    """ Thread-safe collector for per-stage latencies and event counters
+
+    Samples are kept in bounded deques so the collector can be left running for long sessions without growing.
+
+    Parameters:
+    -----------
+        max_samples    (int) : Maximum number of latency samples kept per stage
+    """
+
+    def __init__(self, max_samples=10000):
+        self.max_samples = max_samples
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counters = collections.Counter()
+        self.start_time = time.monotonic()
+
+    def record(self, stage, duration):
+        """ Record a single latency sample (in seconds) for a stage """
+        with self.lock:
+            if stage not in self.samples:
+                self.samples[stage] = collections.deque(maxlen=self.max_samples)
+            self.samples[stage].append(duration)
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        """ Context manager that records the wall time spent inside the block """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - t0)
+
+    def increment(self, name, amount=1):
+        """ Increment an event counter """
+        with self.lock:
+            self.counters[name] += amount
+
+    def count(self, name):
+        """ Returns the value of an event counter """
+        with self.lock:
+            return self.counters[name]
+
+    def percentile(self, stage, pct):
+        """ Returns the given percentile (0-100) for a stage, or None if no samples were recorded """
+        with self.lock:
+            data = sorted(self.samples.get(stage, ()))
+        return _percentile(data, pct)
+
+    def summary(self):
+        """ Returns a dictionary of stage -> {count, mean, p50, p95, p99, max} with values in seconds """
+        with self.lock:
+            snapshot = {stage: sorted(values) for stage, values in self.samples.items()}
+        summary = {}
+        for stage, data in snapshot.items():
+            if not data:
+                continue
+            summary[stage] = {
+                'count': len(data),
+                'mean': sum(data) / len(data),
+                'p50': _percentile(data, 50),
+                'p95': _percentile(data, 95),
+                'p99': _percentile(data, 99),
+                'max': data[-1],
+            }
+        return summary
+
+    def report(self):
+        """ Returns a human-readable table of the stage latencies (in milliseconds) and counters """
+        lines = ["{:<16}{:>8}{:>10}{:>10}{:>10}{:>10}{:>10}".format(
+            "stage", "count", "mean", "p50", "p95", "p99", "max")]
+        for stage, s in sorted(self.summary().items()):
+            lines.append("{:<16}{:>8}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}".format(
+                stage, s['count'], s['mean'] * 1e3, s['p50'] * 1e3, s['p95'] * 1e3, s['p99'] * 1e3, s['max'] * 1e3))
+        with self.lock:
+            counters = dict(self.counters)
+        for name, value in sorted(counters.items()):
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def reset(self):
+        """ Clears all samples and counters """
+        with self.lock:
+            self.samples.clear()
+            self.counters.clear()
+            self.start_time = time.monotonic()
+
+
+def compare_summaries(baseline, current, metrics=('p50', 'p95')):
+    """ Returns a human-readable table comparing two `PerfStats.summary()` results (milliseconds and relative change)
+
+    Parameters:
+    -----------
+        baseline    (dict) : Summary of the reference run
+        current     (dict) : Summary of the run being checked
+        metrics    (tuple) : Summary fields to compare
+    """
+    header = "{:<16}".format("stage")
+    for metric in metrics:
+        header += "{:>12}{:>12}{:>9}".format(f"{metric} base", f"{metric} new", "delta")
+    lines = [header]
+    for stage in sorted(set(baseline) | set(current)):
+        line = "{:<16}".format(stage)
+        for metric in metrics:
+            old, new = baseline.get(stage, {}).get(metric), current.get(stage, {}).get(metric)
+            delta = f"{(new - old) / old * 100:+.1f}%" if old and new is not None else "n/a"
+            line += "{:>12}{:>12}{:>9}".format(f"{old * 1e3:.2f}" if old is not None else "-",
+                                               f"{new * 1e3:.2f}" if new is not None else "-", delta)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _percentile(data, pct):
+    """ Nearest-rank percentile of an already sorted list """
+    if not data:
+        return None
+    rank = max(0, min(len(data) - 1, math.ceil(pct / 100.0 * len(data)) - 1))
+    return data[rank]
@@ -0,0 +1,174 @@
+import re
+import json
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict, ValidationError, ValidationInfo, field_validator, model_validator
+
+
+def _drop_invalid(entries, model, info: ValidationInfo):
+    """ Validates named entries one by one so a single malformed entry doesn't reject the whole reply. Invalid entries
+    are dropped and described in the validation context's 'dropped' list (if a context was given). """
+    if entries is None:
+        return None
+    dropped = info.context.setdefault("dropped", []) if info.context is not None else []
+    if not isinstance(entries, dict):
+        dropped.append(f"{info.field_name}: expected an object")
+        return None
+    valid = {}
+    for name, entry in entries.items():
+        try:
+            valid[name] = model.model_validate(entry, context=info.context)
+        except ValidationError as e:
+            dropped.append(f"{info.field_name}.{name}: {e.errors()[0]['msg']}")
+    return valid
+
+
+class MessageBlock(BaseModel):
+    """ Spoken/printed part of a reply. `message_1` is required, further `message_N` entries are allowed and must be
+    text: numbers are converted, anything else is dropped """
+    model_config = ConfigDict(extra="allow")
+    __pydantic_extra__: Dict[str, str]
+
+    message_1: str
+
+    @model_validator(mode="before")
+    @classmethod
+    def _text_extras(cls, data, info: ValidationInfo):
+        if not isinstance(data, dict):
+            return data
+        dropped = info.context.setdefault("dropped", []) if info.context is not None else []
+        cleaned = {}
+        for name, value in data.items():
+            if name != "message_1" and not isinstance(value, str):
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    value = str(value)
+                else:
+                    dropped.append(f"Message.{name}: expected text")
+                    continue
+            cleaned[name] = value
+        return cleaned
+
+
+class MoveJoint(BaseModel):
+    """ Single joint command, `motor` is a joint name ('base', 'gripper', ...) or motor number """
+    motor: str
+    value: float
+
+    @field_validator("motor", mode="before")
+    @classmethod
+    def _motor_to_str(cls, v):
+        return str(v) if isinstance(v, int) else v
+
+
+class Movement(BaseModel):
+    """ A named movement step """
+    model_config = ConfigDict(extra="allow")
+
+    move_joint: Optional[MoveJoint] = None
+
+
+class ActionBlock(BaseModel):
+    """ One action entry, made of hardware skills and/or robot movements """
+    skills: Optional[Dict[str, Dict[str, Any]]] = None
+    movements: Optional[Dict[str, Movement]] = None
+
+    @field_validator("movements", mode="before")
+    @classmethod
+    def _drop_invalid_movements(cls, v, info: ValidationInfo):
+        return _drop_invalid(v, Movement, info)
+
+
+class AgentResponse(BaseModel):
+    """ Typed version of the Message/Action reply format described in prompts/message_template.txt """
+    Message: MessageBlock
+    Action: Optional[Dict[str, ActionBlock]] = None
+
+    @field_validator("Message", mode="before")
+    @classmethod
+    def _wrap_plain_message(cls, v):
+        return {"message_1": v} if isinstance(v, str) else v
+
+    @field_validator("Action", mode="before")
+    @classmethod
+    def _drop_invalid_actions(cls, v, info: ValidationInfo):
+        return _drop_invalid(v, ActionBlock, info)
+
+
+def format_instructions():
+    """ Returns a compact prompt snippet describing the reply schema, appended to the system prompt in JSON mode """
+    schema = json.dumps(AgentResponse.model_json_schema(), separators=(",", ":"))
+    return ("Always reply with a single JSON object and nothing else. The JSON must match this schema:\n" + schema)
+
+
+_FENCE_RE = re.compile(r"^```(?:json)?\s*|\s*```$", re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_SMART_QUOTES = str.maketrans({"“": '"', "”": '"', "‘": "'", "’": "'"})
+
+
+def repair_json(text):
+    """ Cheap local repair pass for near-miss JSON from the model
+
+    Handles markdown code fences, prose before/after the object, smart quotes, trailing commas, single-quoted keys
+    and unclosed braces. Returns the repaired string, which may still fail to parse.
+    """
+    text = _FENCE_RE.sub("", text.strip()).translate(_SMART_QUOTES)
+
+    # Keep only the outermost object if the model wrapped it in prose
+    start = text.find("{")
+    if start == -1:
+        return text
+    end = text.rfind("}")
+    text = text[start:end + 1] if end > start else text[start:]
+
+    text = _TRAILING_COMMA_RE.sub(r"\1", text)
+    if '"' not in text:
+        text = text.replace("'", '"')
+
+    # Close any braces/brackets the model forgot, ignoring those inside strings
+    stack, in_string, escaped = [], False, False
+    for c in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == '"':
+                in_string = False
+        elif c == '"':
+            in_string = True
+        elif c in "{[":
+            stack.append("}" if c == "{" else "]")
+        elif c in "}]" and stack:
+            stack.pop()
+    if in_string:
+        text += '"'
+    return text + "".join(reversed(stack))
+
+
+def parse_agent_response(text):
+    """ Validates a model reply against AgentResponse
+
+    Malformed action or movement entries are dropped individually, the rest of the reply (in particular the message)
+    is kept.
+
+    Parameters:
+    -----------
+        text    (str) : Raw model reply
+
+    Returns:
+    --------
+        (AgentResponse or None, str, list) : The parsed reply, how it was obtained ('ok', 'repaired' or 'failed') and
+                                             descriptions of the dropped entries
+    """
+    context = {"dropped": []}
+    try:
+        return AgentResponse.model_validate_json(text, context=context), "ok", context["dropped"]
+    except ValidationError:
+        pass
+
+    context = {"dropped": []}
+    try:
+        parsed = AgentResponse.model_validate(json.loads(repair_json(text)), context=context)
+        return parsed, "repaired", context["dropped"]
+    except (ValueError, ValidationError):
+        return None, "failed", []
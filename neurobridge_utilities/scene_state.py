@@ -0,0 +1,145 @@
+import time
+import threading
+
+
+def _iou(a, b):
+    """ Intersection over union of two [x1, y1, x2, y2] boxes """
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, ix2 - ix1) * max(0.0, iy2 - iy1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class TrackedObject:
+    """ A detection tracked across frames """
+
+    def __init__(self, track_id, label, box, confidence, now):
+        self.track_id = track_id
+        self.label = label
+        self.box = box
+        self.confidence = confidence
+        self.first_seen = now
+        self.last_seen = now
+
+
+class SceneState:
+    """ Keeps the latest tracked object detections and renders them as a compact text summary for the LLM
+
+    Detections are matched to existing tracks by label and box overlap, and tracks that haven't been seen for
+    `max_age` seconds are dropped. The summary describes positions coarsely (left/center/right, top/middle/bottom) so
+    detector jitter doesn't count as a change; the scene version only increases when the set of labels and their
+    regions changes (losing and re-detecting the same object doesn't count).
+
+    Parameters:
+    -----------
+        max_age               (float) : Seconds an unseen object is remembered
+        iou_threshold         (float) : Minimum box overlap to match a detection to an existing track
+        max_summary_tokens      (int) : Approximate token budget for the summary text
+    """
+
+    def __init__(self, max_age=5.0, iou_threshold=0.3, max_summary_tokens=120):
+        self.max_age = max_age
+        self.iou_threshold = iou_threshold
+        self.max_summary_tokens = max_summary_tokens
+        self.lock = threading.Lock()
+        self.tracks = {}
+        self.next_track_id = 1
+        self.frame_size = None  # (height, width)
+        self.version = 0
+        self.signature = ()
+
+    def update(self, boxes, confidences, labels, frame_shape=None, now=None):
+        """
+        Updates the tracks with one frame's detections.
+
+        Parameters:
+        - boxes (list): Boxes as [x1, y1, x2, y2] in pixels.
+        - confidences (list): Detection scores.
+        - labels (list): Class names.
+        - frame_shape (tuple): Shape of the frame the detections came from, (height, width, ...).
+        - now (float): Timestamp of the frame, defaults to time.monotonic().
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if frame_shape is not None:
+                self.frame_size = tuple(frame_shape[:2])
+
+            unmatched = set(self.tracks)
+            for box, confidence, label in zip(boxes, confidences, labels):
+                box = [float(v) for v in box]
+                best_id, best_iou = None, self.iou_threshold
+                for track_id in unmatched:
+                    track = self.tracks[track_id]
+                    if track.label == label:
+                        iou = _iou(track.box, box)
+                        if iou >= best_iou:
+                            best_id, best_iou = track_id, iou
+                if best_id is None:
+                    best_id = self.next_track_id
+                    self.next_track_id += 1
+                    self.tracks[best_id] = TrackedObject(best_id, label, box, float(confidence), now)
+                else:
+                    unmatched.discard(best_id)
+                    track = self.tracks[best_id]
+                    track.box, track.confidence, track.last_seen = box, float(confidence), now
+
+            self._expire(now)
+            self._update_version()
+
+    def _expire(self, now):
+        for track_id in [t for t, track in self.tracks.items() if now - track.last_seen > self.max_age]:
+            del self.tracks[track_id]
+
+    def _region(self, box):
+        """ Coarse position of a box in the frame, e.g. 'top-left' """
+        if not self.frame_size:
+            return "in view"
+        height, width = self.frame_size
+        cx, cy = (box[0] + box[2]) / 2 / width, (box[1] + box[3]) / 2 / height
+        horizontal = "left" if cx < 1 / 3 else "right" if cx > 2 / 3 else "center"
+        vertical = "top" if cy < 1 / 3 else "bottom" if cy > 2 / 3 else "middle"
+        return f"{vertical}-{horizontal}"
+
+    def _update_version(self):
+        signature = tuple(sorted((t.label, self._region(t.box)) for t in self.tracks.values()))
+        if signature != self.signature:
+            self.signature = signature
+            self.version += 1
+
+    def summary(self, now=None):
+        """ Returns the compact, token-bounded text description of the current scene """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self._expire(now)
+            self._update_version()
+            tracks = sorted(self.tracks.values(), key=lambda t: t.confidence, reverse=True)
+            if not tracks:
+                return "Camera scene: no objects detected."
+
+            header = f"Camera scene: {len(tracks)} object(s)."
+            budget = self.max_summary_tokens * 4 - len(header)  # ~4 characters per token
+            parts = []
+            for i, track in enumerate(tracks):
+                part = (f" {track.label}#{track.track_id} {self._region(track.box)} conf {track.confidence:.2f}, "
+                        f"seen {now - track.last_seen:.0f}s ago;")
+                remaining = len(tracks) - i
+                if len(part) > budget - (len(f" +{remaining} more.") if remaining > 1 else 0):
+                    parts.append(f" +{remaining} more.")
+                    break
+                parts.append(part)
+                budget -= len(part)
+            return header + "".join(parts)
+
+    def context(self):
+        """
+        Returns the current scene summary for the LLM.
+
+        Returns:
+        - str or None: The summary, or None if nothing was ever detected (e.g. the camera is off).
+        """
+        summary = self.summary()
+        with self.lock:
+            if self.version == 0:
+                return None
+        return summary
@@ -0,0 +1,157 @@
+import json
+import time
+import struct
+import threading
+
+# File layout: MAGIC, then records of RECORD_HEADER (seconds since start, event kind, payload length) + payload
+MAGIC = b"NBREC\x01"
+RECORD_HEADER = struct.Struct("<dBI")
+
+EVENT_META = 0        # JSON: recording start time and server parameters
+EVENT_INPUT = 1       # JSON: {"source", "session", "query"} plus "rejected" (reason) if the server refused it
+EVENT_LLM_REPLY = 2   # JSON: {"thread", "latency", "reply", "status"}, status 'ok', 'cancelled' or 'error'
+EVENT_SERIAL_TX = 3   # Raw bytes written to the robot
+EVENT_SERIAL_RX = 4   # Raw bytes read from the robot
+EVENT_FRAME = 5       # JPEG-encoded camera frame
+EVENT_STATS = 6       # JSON: PerfStats summary and counters at the end of the session
+
+EVENT_NAMES = {EVENT_META: "meta", EVENT_INPUT: "input", EVENT_LLM_REPLY: "llm_reply", EVENT_SERIAL_TX: "serial_tx",
+               EVENT_SERIAL_RX: "serial_rx", EVENT_FRAME: "frame", EVENT_STATS: "stats"}
+
+
+class SessionRecorder:
+    """ Records a server session into a compact binary log for offline replay
+
+    Every user input, LLM reply, serial write/read and (optionally) camera frame is appended as a small timestamped
+    record. Writes go through a buffered file under a lock, so recording costs a few microseconds per event and can be
+    left on in production. Use `read_session_log` to iterate over a log and `benchmarks/replay_session.py` to replay it.
+
+    Parameters:
+    -----------
+        log_file          (str) : Path of the log file to write
+        metadata         (dict) : JSON-serializable server settings stored at the start of the log
+        record_frames    (bool) : Also record camera frames (JPEG encoded)
+        frame_interval  (float) : Minimum seconds between recorded frames
+        jpeg_quality      (int) : JPEG quality for recorded frames
+    """
+
+    def __init__(self, log_file, metadata=None, record_frames=False, frame_interval=0.5, jpeg_quality=70):
+        self.log_file = log_file
+        self.record_frames = record_frames
+        self.frame_interval = frame_interval
+        self.jpeg_quality = jpeg_quality
+        self.lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.last_frame_time = None
+        self.event_count = 0
+        self.file = open(log_file, "wb")
+        self.file.write(MAGIC)
+        self._record_json(EVENT_META, {"version": 1, "started": time.time(), "parameters": metadata or {}})
+        print(f"⏺️ Recording session to {log_file}")
+
+    def record(self, kind, payload):
+        """ Appends one record. `payload` is raw bytes. """
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(RECORD_HEADER.pack(time.monotonic() - self.start_time, kind, len(payload)))
+            self.file.write(payload)
+            self.event_count += 1
+
+    def _record_json(self, kind, data):
+        self.record(kind, json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    def record_input(self, query, session_id, source, rejected=None):
+        """ Records a user query as received by the server (terminal line, STT transcript, network message), with
+        the reason if the server rejected it (rate limit, full queue) """
+        data = {"source": source, "session": session_id, "query": query}
+        if rejected:
+            data["rejected"] = rejected
+        self._record_json(EVENT_INPUT, data)
+
+    def record_llm_reply(self, thread_id, reply, latency, status="ok"):
+        """ Records the raw LLM reply for a conversation thread and how long it took. Calls that were cancelled or
+        failed are recorded too (status 'cancelled' or 'error', no reply), so replies stay aligned with the requests
+        on replay. """
+        self._record_json(EVENT_LLM_REPLY, {"thread": thread_id, "latency": latency, "reply": reply,
+                                            "status": status})
+
+    def record_frame(self, frame, rgb=False):
+        """ Records a camera frame (BGR, or RGB if `rgb`), at most one every `frame_interval` seconds """
+        if not self.record_frames:
+            return
+        now = time.monotonic()
+        if self.last_frame_time is not None and now - self.last_frame_time < self.frame_interval:
+            return
+        self.last_frame_time = now
+        import cv2  # Only needed when frames are recorded, the camera already depends on it
+        if rgb:
+            frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if ok:
+            self.record(EVENT_FRAME, data.tobytes())
+
+    def close(self, stats=None):
+        """ Writes the final stage timings (if a PerfStats is given) and closes the log """
+        if stats is not None:
+            self._record_json(EVENT_STATS, {"stages": stats.summary(), "counters": dict(stats.counters)})
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.close()
+            self.file = None
+        print(f"⏹️ Session recording saved to {self.log_file} ({self.event_count} events)")
+
+
+class RecordingSerial:
+    """ Wraps a serial device and records everything written to and read from it
+
+    Parameters:
+    -----------
+        device               (object) : The wrapped `serial.Serial` (or compatible) device
+        recorder    (SessionRecorder) : Where the traffic is recorded
+    """
+
+    def __init__(self, device, recorder):
+        self.device = device
+        self.recorder = recorder
+
+    def __getattr__(self, name):
+        return getattr(self.device, name)
+
+    def write(self, data):
+        self.recorder.record(EVENT_SERIAL_TX, bytes(data))
+        return self.device.write(data)
+
+    def readline(self):
+        line = self.device.readline()
+        if line:
+            self.recorder.record(EVENT_SERIAL_RX, bytes(line))
+        return line
+
+
+def read_session_log(log_file):
+    """ Iterates over the records of a session log
+
+    Parameters:
+    -----------
+        log_file    (str) : Path of the log file
+
+    Returns:
+    --------
+        generator : (seconds since start, event kind, payload) tuples. JSON payloads are decoded to dicts, the rest
+                    are left as bytes. A record cut short (e.g. by a crash) ends the iteration.
+    """
+    json_events = (EVENT_META, EVENT_INPUT, EVENT_LLM_REPLY, EVENT_STATS)
+    with open(log_file, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{log_file} is not a NeuroBridge session log")
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            timestamp, kind, length = RECORD_HEADER.unpack(header)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+            yield timestamp, kind, json.loads(payload) if kind in json_events else payload
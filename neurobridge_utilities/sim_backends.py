@@ -0,0 +1,288 @@
+import json
+import time
+import random
+import threading
+import itertools
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Canned replies following the Message/Action format expected by AISkills
+DEFAULT_REPLIES = [
+    {"Message": {"message_1": "Hello! I am ready to help."}},
+    {"Message": {"message_1": "Sure, moving the base now."},
+     "Action": {"action_1": {"movements": {"turn_base": {"move_joint": {"motor": "base", "value": 90}}}}}},
+    {"Message": {"message_1": "Opening the gripper."},
+     "Action": {"action_1": {"movements": {"open_gripper": {"move_joint": {"motor": "gripper", "value": 0}}}}}},
+    {"Message": {"message_1": "Turning on the camera."},
+     "Action": {"action_1": {"skills": {"camera_enable": {}}}}},
+]
+
+
+def load_replies(replies_file):
+    """ Loads canned LLM replies from a file. Accepts a JSON list or one JSON object per line.
+
+    Parameters:
+    -----------
+        replies_file    (str) : Path to the replies file
+
+    Returns:
+    --------
+        list : Reply strings, ready to be sent back as message content
+    """
+    with open(replies_file, "r", encoding="utf-8") as file:
+        text = file.read().strip()
+    if text.startswith("["):
+        replies = json.loads(text)
+    else:
+        replies = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return [r if isinstance(r, str) else json.dumps(r) for r in replies]
+
+
+class FakeGroqServer:
+    """ Local stand-in for the Groq chat completions API
+
+    Speaks the OpenAI-compatible `/openai/v1/chat/completions` endpoint used by `ChatGroq`, so pointing the client at
+    it (`GROQ_API_BASE` or `base_url`) exercises the real Langchain/langgraph code path without network access. Replies
+    are replayed from a canned list with a configurable first-token latency and token rate. Errors and slow tail
+    responses can be injected to exercise retries, hedging and fallbacks.
+
+    Parameters:
+    -----------
+        replies               (list) : Canned reply strings or dicts, served in round-robin order
+        first_token_latency  (float) : Seconds before the first token is produced
+        tokens_per_second    (float) : Generation rate after the first token
+        jitter               (float) : Relative uniform jitter applied to both latencies (0.1 = +/-10%)
+        error_rate           (float) : Fraction of requests answered with `error_status` instead of a reply
+        error_status           (int) : HTTP status used for injected errors (429, 500, 503, ...)
+        slow_rate            (float) : Fraction of requests whose latencies are multiplied by `slow_factor`
+        slow_factor          (float) : Latency multiplier for slow requests
+        host                   (str) : Interface to bind to
+        port                   (int) : Port to bind to, 0 picks a free port
+        seed                   (int) : Seed for the jitter generator
+        latencies             (list) : Optional first-token latency per reply (e.g. recorded ones), cycled with the
+                                       replies and used instead of `first_token_latency`
+        statuses              (list) : Optional HTTP error status (or None for a normal reply) per reply, cycled with
+                                       the replies, e.g. to replay recorded failures
+    """
+
+    def __init__(self, replies=None, first_token_latency=0.2, tokens_per_second=500.0, jitter=0.0,
+                 error_rate=0.0, error_status=429, slow_rate=0.0, slow_factor=10.0,
+                 host="127.0.0.1", port=0, seed=0, latencies=None, statuses=None):
+        replies = replies or DEFAULT_REPLIES
+        self.replies = [r if isinstance(r, str) else json.dumps(r) for r in replies]
+        self.first_token_latency = first_token_latency
+        self.tokens_per_second = tokens_per_second
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.slow_rate = slow_rate
+        self.slow_factor = slow_factor
+        self.request_count = 0
+        self.error_count = 0
+        self._reply_cycle = itertools.cycle(self.replies)
+        self._latency_cycle = itertools.cycle(latencies) if latencies else None
+        self._status_cycle = itertools.cycle(statuses) if statuses else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+        server = self
+        class _Handler(_FakeGroqHandler):
+            fake = server
+
+        self.httpd = ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def base_url(self):
+        """ Base URL to hand to `ChatGroq(base_url=...)` or the `GROQ_API_BASE` environment variable """
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """ Starts serving requests in a background thread """
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """ Stops the server and releases the socket """
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def next_reply(self):
+        """ Returns the next canned reply as (text, first_token_delay, per_token_delay, error_status), where
+        error_status is None unless an error was injected """
+        with self._lock:
+            self.request_count += 1
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.error_count += 1
+                return None, 0.0, 0.0, self.error_status
+            text = next(self._reply_cycle)
+            first_token = next(self._latency_cycle) if self._latency_cycle else self.first_token_latency
+            status = next(self._status_cycle) if self._status_cycle else None
+            if status is not None:
+                self.error_count += 1
+                return None, 0.0, 0.0, status
+            scale = 1.0 + self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 1.0
+            if self.slow_rate and self._rng.random() < self.slow_rate:
+                scale *= self.slow_factor
+        per_token = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        return text, first_token * scale, per_token * scale, None
+
+
+class _FakeGroqHandler(BaseHTTPRequestHandler):
+    """ Request handler for FakeGroqServer """
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real API
+    fake = None
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown endpoint {self.path}"}})
+            return
+
+        model = body.get("model", "fake-model")
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+        text, first_delay, token_delay, error_status = self.fake.next_reply()
+        if error_status is not None:
+            self._send_json(error_status, {"error": {"message": "Injected error", "type": "fake_error"}},
+                            headers={"retry-after": "0"} if error_status == 429 else None)
+            return
+        tokens = _tokenize(text)
+        created = int(time.time())
+        completion_id = f"chatcmpl-fake-{self.fake.request_count}"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                 "total_tokens": prompt_tokens + len(tokens)}
+
+        if body.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            time.sleep(first_delay)
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(token_delay)
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+                self._send_event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                                  "model": model,
+                                  "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+            self._send_event({"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                              "model": model, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                              "x_groq": {"id": completion_id, "usage": usage}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        else:
+            time.sleep(first_delay + token_delay * max(0, len(tokens) - 1))
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                             "finish_reason": "stop", "logprobs": None}],
+                "usage": usage, "system_fingerprint": "fp_fake",
+            })
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_event(self, payload):
+        self.wfile.write(b"data: " + json.dumps(payload).encode() + b"\n\n")
+        self.wfile.flush()
+
+
+def _tokenize(text):
+    """ Rough token split (~4 characters per token) used to pace the fake generation """
+    return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+class FakeAudioClient:
+    """ Stand-in for AIAudio that plays nothing and transcribes from a script
+
+    Parameters:
+    -----------
+        chars_per_second    (float) : Simulated speaking rate, `say` blocks for len(text) / chars_per_second seconds
+        transcripts          (list) : Phrases returned in order by `listen_and_transcribe`
+    """
+
+    def __init__(self, chars_per_second=0.0, transcripts=None):
+        self.chars_per_second = chars_per_second
+        self.transcripts = collections.deque(transcripts or [])
+        self.spoken = collections.deque(maxlen=1000)
+
+    def say(self, text):
+        """ Simulates speaking the text """
+        if self.chars_per_second > 0:
+            time.sleep(len(text) / self.chars_per_second)
+        self.spoken.append(text)
+        return True
+
+    def listen_and_transcribe(self):
+        """ Returns the next scripted transcript, or an empty string when the script is exhausted """
+        return self.transcripts.popleft() if self.transcripts else ""
+
+
+class FakeSerial:
+    """ Simulated serial port implementing the subset of `serial.Serial` used by MiniArmClient
+
+    Writes are delayed by the time the bytes would take on the wire, and `get_pose` commands are answered with a pose
+    line in the same format as the MiniArm firmware (see `replies_to`).
+
+    Parameters:
+    -----------
+        baudrate    (int) : Simulated line rate (10 bits per byte), 0 disables the wire delay
+    """
+
+    def __init__(self, baudrate=9600):
+        self.baudrate = baudrate
+        self.is_open = True
+        self.written = collections.deque(maxlen=1000)
+        self.bytes_written = 0
+        self._rx = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def in_waiting(self):
+        with self._lock:
+            return sum(len(line) for line in self._rx)
+
+    def write(self, data):
+        if self.baudrate:
+            time.sleep(len(data) * 10.0 / self.baudrate)
+        with self._lock:
+            self.written.append(data)
+            self.bytes_written += len(data)
+            self._rx.extend(self.replies_to(data))
+        return len(data)
+
+    def replies_to(self, data):
+        """ Returns the lines the robot sends back for a write """
+        if b"get_pose" in data:
+            return [b"[0.000][Robot]Current pose:   cords: [x: 0.13500, y: 0.00000, z: 0.21500]"
+                    b"angles: [Roll: 0.00000, Pitch: 0.00000, Yaw:0.00000]tool: 0\r\n"]
+        return []
+
+    def readline(self):
+        with self._lock:
+            return self._rx.popleft() if self._rx else b""
+
+    def reset_output_buffer(self):
+        pass  # Writes complete synchronously, nothing is ever left to discard
+
+    def reset_input_buffer(self):
+        with self._lock:
+            self._rx.clear()
+
+    def close(self):
+        self.is_open = False